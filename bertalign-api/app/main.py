@@ -1,4 +1,5 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
 import sys
@@ -57,7 +58,8 @@ app = FastAPI(
         "url": "https://opensource.org/licenses/MIT"
     },
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware to enable frontend requests
@@ -92,7 +94,9 @@ async def root():
             "docs": "/docs", 
             "redoc": "/redoc",
             "basic_alignment": "/align",
-            "tei_alignment": "/align/tei"
+            "batch_alignment": "/align/batch",
+            "tei_alignment": "/align/tei",
+            "batch_tei_alignment": "/align/tei/batch"
         },
         "supported_languages": "ca, zh, cs, da, nl, en, fi, fr, de, el, hu, is, it, lt, lv, no, pl, pt, ro, ru, sk, sl, es, sv, tr"
     }
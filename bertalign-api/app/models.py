@@ -14,6 +14,10 @@ from typing import List, Optional
 from pydantic import BaseModel, Field, validator
 
 
+# Maximum length (in characters) of each TEI document in a TEI alignment request
+MAX_TEI_LEN = 1_000_000
+
+
 class AlignmentRequest(BaseModel):
     """
     Request model for basic text alignment using Bertalign's semantic similarity.
@@ -105,9 +109,10 @@ class AlignmentRequest(BaseModel):
     
     @validator('source_text', 'target_text')
     def validate_text_not_empty(cls, v):
-        if not v or not v.strip():
+        stripped = v.strip()
+        if not stripped:
             raise ValueError('Text cannot be empty or whitespace only')
-        return v.strip()
+        return stripped
     
     @validator('source_language', 'target_language')
     def validate_supported_language(cls, v):
@@ -253,7 +258,7 @@ class TEIAlignmentRequest(BaseModel):
         ...,
         description="Language A TEI XML document as string. Must be valid TEI XML with text content in <body> elements",
         min_length=1,
-        max_length=1000000,
+        max_length=MAX_TEI_LEN,
         example='<?xml version="1.0" encoding="UTF-8"?>\n<TEI xmlns="http://www.tei-c.org/ns/1.0">\n  <teiHeader>\n    <fileDesc>\n      <titleStmt><title>Example</title></titleStmt>\n    </fileDesc>\n  </teiHeader>\n  <text><body><p>Hello world.</p></body></text>\n</TEI>'
     )
     
@@ -261,7 +266,7 @@ class TEIAlignmentRequest(BaseModel):
         ...,
         description="Language B TEI XML document as string. Should be the parallel/translated version of language A document",
         min_length=1,
-        max_length=1000000,
+        max_length=MAX_TEI_LEN,
         example='<?xml version="1.0" encoding="UTF-8"?>\n<TEI xmlns="http://www.tei-c.org/ns/1.0">\n  <teiHeader>\n    <fileDesc>\n      <titleStmt><title>Exemple</title></titleStmt>\n    </fileDesc>\n  </teiHeader>\n  <text><body><p>Bonjour le monde.</p></body></text>\n</TEI>'
     )
     
@@ -319,9 +324,10 @@ class TEIAlignmentRequest(BaseModel):
     
     @validator('languageA', 'languageB')
     def validate_tei_not_empty(cls, v):
-        if not v or not v.strip():
+        stripped = v.strip()
+        if not stripped:
             raise ValueError('TEI XML cannot be empty or whitespace only')
-        return v.strip()
+        return stripped
     
     @validator('languageA_name', 'languageB_name')
     def validate_supported_language(cls, v):
@@ -7,10 +7,15 @@ Embedding) model for semantic similarity-based sentence alignment across 25 lang
 
 Endpoints:
 - POST /align: Basic text-to-text alignment
+- POST /align/batch: Several independent text-to-text alignments in one request
 - POST /align/tei: TEI XML document alignment with standOff annotations
+- POST /align/tei/batch: Several independent TEI document alignments in one request
 """
 
-from fastapi import APIRouter, HTTPException, status
+from typing import List
+
+from fastapi import APIRouter, Body, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from app.models import AlignmentRequest, AlignmentResponse, ErrorResponse, TEIAlignmentRequest, TEIAlignmentResponse
 from app.services.bertalign_service import BertalignService
 from app.services.tei_service import TEIService
@@ -22,6 +27,16 @@ bertalign_service = BertalignService()
 tei_service = TEIService(bertalign_service)
 
 
+def get_bertalign_service() -> BertalignService:
+    """Dependency returning the shared Bertalign service."""
+    return bertalign_service
+
+
+def get_tei_service() -> TEIService:
+    """Dependency returning the shared TEI service."""
+    return tei_service
+
+
 @router.post(
     "",
     response_model=AlignmentResponse,
@@ -45,10 +60,45 @@ tei_service = TEIService(bertalign_service)
         500: {"model": ErrorResponse, "description": "Internal server error (model loading failure, processing error)"},
     }
 )
-async def align_texts(request: AlignmentRequest) -> AlignmentResponse:
+async def align_texts(
+    request: AlignmentRequest,
+    bertalign_service: BertalignService = Depends(get_bertalign_service)
+) -> AlignmentResponse:
     """Align sentences between source and target texts using Bertalign."""
     try:
-        return bertalign_service.align_texts(request)
+        # Alignment is CPU-bound; run it off the event loop
+        return await run_in_threadpool(bertalign_service.align_texts, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post(
+    "/batch",
+    response_model=List[AlignmentResponse],
+    status_code=status.HTTP_200_OK,
+    summary="Align several text pairs in one request",
+    description="""
+    Align a list of independent source/target text pairs with a single HTTP round-trip.
+    
+    Each item accepts the same fields as `POST /align` and the response list preserves
+    the order of the request list. A failure in any item fails the whole batch.
+    
+    **Batch size:** 1-50 alignment requests
+    """,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid input in one of the batch items"},
+        500: {"model": ErrorResponse, "description": "Internal server error (model loading failure, processing error)"},
+    }
+)
+async def align_texts_batch(
+    requests: List[AlignmentRequest] = Body(..., min_length=1, max_length=50),
+    bertalign_service: BertalignService = Depends(get_bertalign_service)
+) -> List[AlignmentResponse]:
+    """Align several independent text pairs using Bertalign."""
+    try:
+        return await run_in_threadpool(bertalign_service.align_texts_batch, requests)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -85,10 +135,14 @@ async def align_texts(request: AlignmentRequest) -> AlignmentResponse:
         500: {"model": ErrorResponse, "description": "Internal server error (XML parsing failure, alignment processing error)"},
     }
 )
-async def align_tei_documents(request: TEIAlignmentRequest) -> TEIAlignmentResponse:
+async def align_tei_documents(
+    request: TEIAlignmentRequest,
+    tei_service: TEIService = Depends(get_tei_service)
+) -> TEIAlignmentResponse:
     """Align two TEI documents and return aligned XML with standOff structure."""
     try:
         # Set bertalign parameters from request
+        bertalign_service = tei_service.bertalign_service
         bertalign_service.max_align = request.max_align
         bertalign_service.top_k = request.top_k
         bertalign_service.win = request.win
@@ -97,7 +151,8 @@ async def align_tei_documents(request: TEIAlignmentRequest) -> TEIAlignmentRespo
         bertalign_service.len_penalty = request.len_penalty
         
         # Perform TEI alignment
-        result = tei_service.align_tei_documents(
+        result = await run_in_threadpool(
+            tei_service.align_tei_documents,
             source_xml=request.languageA,
             target_xml=request.languageB,
             source_language=request.languageA_name,
@@ -112,3 +167,40 @@ async def align_tei_documents(request: TEIAlignmentRequest) -> TEIAlignmentRespo
         raise HTTPException(status_code=500, detail=f"TEI alignment failed: {str(e)}")
 
 
+@router.post(
+    "/tei/batch",
+    response_model=List[TEIAlignmentResponse],
+    status_code=status.HTTP_200_OK,
+    summary="Align several pairs of TEI XML documents in one request",
+    description="""
+    Align a list of independent TEI document pairs with a single HTTP round-trip.
+    
+    Each item accepts the same fields as `POST /align/tei` and the response list
+    preserves the order of the request list. All documents are parsed concurrently
+    and the pairs are sent to the model as one batch; a failure in any item fails
+    the whole batch.
+    
+    **Batch size:** 1-10 document pairs
+    """,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid TEI XML or unsupported language in one of the batch items"},
+        500: {"model": ErrorResponse, "description": "Internal server error (XML parsing failure, alignment processing error)"},
+    }
+)
+async def align_tei_documents_batch(
+    requests: List[TEIAlignmentRequest] = Body(..., min_length=1, max_length=10),
+    tei_service: TEIService = Depends(get_tei_service)
+) -> List[TEIAlignmentResponse]:
+    """Align several independent TEI document pairs with standOff structure."""
+    try:
+        results = await run_in_threadpool(
+            tei_service.align_tei_documents_batch,
+            [(request.languageA, request.languageB) for request in requests],
+            [(request.languageA_name, request.languageB_name) for request in requests]
+        )
+        return [TEIAlignmentResponse(**result) for result in results]
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"TEI alignment failed: {str(e)}")
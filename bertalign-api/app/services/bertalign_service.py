@@ -1,5 +1,6 @@
 import time
 import logging
+from typing import List
 from bertalign.aligner import Bertalign
 from app.models import AlignmentRequest, AlignmentResponse, AlignmentPair
 
@@ -74,4 +75,10 @@ class BertalignService:
             total_source_sentences=aligner.src_num,
             total_target_sentences=aligner.tgt_num,
             parameters=request
-        )
\ No newline at end of file
+        )
+
+    @staticmethod
+    def align_texts_batch(requests: List[AlignmentRequest]) -> List[AlignmentResponse]:
+        """Align several independent text pairs in one call, preserving order."""
+        logger.info(f"Aligning batch of {len(requests)} text pairs")
+        return [BertalignService.align_texts(request) for request in requests]
@@ -2,19 +2,93 @@
 TEI XML parsing and alignment service.
 Handles extraction, alignment, and output generation for TEI documents.
 """
-import uuid
+import copy
+import hashlib
+import itertools
 import logging
 import re
-from typing import List, Dict, Any, Tuple, Optional
-from xml.etree import ElementTree as ET
-from xml.etree.ElementTree import Element
+import secrets
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Tuple, Optional, Union, Callable
+from xml.sax.saxutils import escape, quoteattr
 from dataclasses import dataclass
 
+from lxml import etree as ET
+from lxml.etree import _Element as Element
+
 from .bertalign_service import BertalignService
-from ..models import AlignmentPair
+from ..models import AlignmentPair, AlignmentRequest, AlignmentResponse
 
 logger = logging.getLogger(__name__)
 
+TEI_NS = 'http://www.tei-c.org/ns/1.0'
+XML_ID = '{http://www.w3.org/XML/1998/namespace}id'
+
+# Mirror the stdlib parser: drop comments and processing instructions and expand only
+# internal entities. xml:ids are not collected, so uploads whose ids repeat or are
+# not NCNames (e.g. "1.2") still parse, as they did with the stdlib parser.
+# External DTDs and entities are never fetched, and libxml2's size limits stay on.
+_PARSER_OPTIONS = dict(remove_comments=True, remove_pis=True,
+                       resolve_entities='internal', collect_ids=False,
+                       load_dtd=False, no_network=True, huge_tree=False)
+
+# lxml serializes every parse that goes through one parser instance, so each
+# thread (a request on the server's threadpool, a batch parsing worker) gets its own
+_parser_local = threading.local()
+
+
+def _parser(encoding: Optional[str] = None) -> ET.XMLParser:
+    """Return this thread's TEI parser, creating it on first use.
+
+    With ``encoding`` the parser ignores the encoding named in the XML
+    declaration, which is how text that was already decoded must be read.
+    """
+    parsers = getattr(_parser_local, 'parsers', None)
+    if parsers is None:
+        parsers = _parser_local.parsers = {}
+    parser = parsers.get(encoding)
+    if parser is None:
+        parser = parsers[encoding] = ET.XMLParser(encoding=encoding, **_PARSER_OPTIONS)
+    return parser
+
+
+# Any run of whitespace, including line breaks, tabs and no-break spaces
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# XPath expressions compiled once and evaluated relative to the node passed in
+_XP_NS = {'tei': TEI_NS}
+_XP_HEADER = ET.XPath('.//tei:teiHeader', namespaces=_XP_NS)
+_XP_BODY = ET.XPath('.//tei:body', namespaces=_XP_NS)
+_XP_TITLE = ET.XPath('.//tei:titleStmt/tei:title', namespaces=_XP_NS)
+_XP_DOC_LANGUAGE = ET.XPath('.//tei:profileDesc/tei:langUsage/tei:language', namespaces=_XP_NS)
+_XP_PROFILE_DESC = ET.XPath('.//tei:profileDesc', namespaces=_XP_NS)
+_XP_LANG_USAGE = ET.XPath('.//tei:langUsage', namespaces=_XP_NS)
+_XP_LANGUAGES = ET.XPath('.//tei:language', namespaces=_XP_NS)
+
+
+def _tei(tag: str) -> str:
+    """Qualify a local tag name with the TEI namespace."""
+    return f'{{{TEI_NS}}}{tag}'
+
+
+def _id_generator() -> Callable[[], str]:
+    """Return a factory of xml:id values unique within and across alignments.
+
+    One random prefix is drawn per alignment and combined with a counter, so ids
+    cost no entropy syscall each and always start with a letter (valid NCNames).
+    """
+    prefix = secrets.token_hex(6)
+    counter = itertools.count()
+    return lambda: f"seg-{prefix}-{next(counter):x}"
+
+
+def _first(xpath: ET.XPath, node: Element) -> Optional[Element]:
+    """Return the first match of a compiled XPath, or None."""
+    matches = xpath(node)
+    return matches[0] if matches else None
+
 @dataclass
 class TEIElement:
     """Represents a TEI element with its text content and structure info."""
@@ -36,14 +110,72 @@ class TEIDocument:
 class TEIService:
     """Service for processing TEI documents and generating alignments."""
     
-    def __init__(self, bertalign_service: BertalignService):
+    # The cache is bounded by input size, since a parsed tree takes roughly an order
+    # of magnitude more memory than its XML: at most PARSE_CACHE_MAX_BYTES of input
+    # in total, and documents above PARSE_CACHE_MAX_DOCUMENT_BYTES are never cached
+    PARSE_CACHE_MAX_BYTES = 4 * 1024 * 1024
+    PARSE_CACHE_MAX_DOCUMENT_BYTES = 512 * 1024
+    
+    def __init__(self, bertalign_service: BertalignService,
+                 parse_cache_max_bytes: Optional[int] = None,
+                 parse_cache_max_document_bytes: Optional[int] = None):
         self.bertalign_service = bertalign_service
-        self.ns = {'tei': 'http://www.tei-c.org/ns/1.0'}
+        self.ns = {'tei': TEI_NS}
+        if parse_cache_max_bytes is not None:
+            self.PARSE_CACHE_MAX_BYTES = parse_cache_max_bytes
+        if parse_cache_max_document_bytes is not None:
+            self.PARSE_CACHE_MAX_DOCUMENT_BYTES = parse_cache_max_document_bytes
+        # Parsed documents and their input sizes keyed on a digest of their bytes,
+        # least recently used first
+        self._parse_cache: "OrderedDict[bytes, Tuple[TEIDocument, int]]" = OrderedDict()
+        self._parse_cache_bytes = 0
+        self._parse_cache_lock = threading.Lock()
     
-    def parse_tei_file(self, xml_content: str) -> TEIDocument:
-        """Parse TEI XML content and extract text elements."""
+    def parse_tei_file(self, xml_content: Union[str, bytes]) -> TEIDocument:
+        """Parse TEI XML content and extract text elements.
+
+        Bytes are handed to the parser as-is, so the XML declaration decides the
+        encoding; strings are already decoded, so they are encoded as UTF-8 and
+        parsed as UTF-8 whatever their declaration says. Recently parsed documents
+        are cached within the byte limits above, so re-uploading the same
+        document skips parsing; the returned TEIDocument is shared and must not
+        be modified.
+        """
+        encoding = None
+        if isinstance(xml_content, str):
+            xml_content = xml_content.encode('utf-8')
+            encoding = 'utf-8'
+        size = len(xml_content)
+        if size > min(self.PARSE_CACHE_MAX_DOCUMENT_BYTES, self.PARSE_CACHE_MAX_BYTES):
+            return self._parse_tei_bytes(xml_content, encoding)
+        # The same bytes can decode differently as text and as raw bytes, so the
+        # two kinds of input never share a cache entry
+        key = hashlib.blake2b(xml_content, digest_size=16, person=b'str' if encoding else b'').digest()
+        
+        with self._parse_cache_lock:
+            entry = self._parse_cache.get(key)
+            if entry is not None:
+                self._parse_cache.move_to_end(key)
+                return entry[0]
+        
+        doc = self._parse_tei_bytes(xml_content, encoding)
+        
+        with self._parse_cache_lock:
+            if key not in self._parse_cache:
+                self._parse_cache[key] = (doc, size)
+                self._parse_cache_bytes += size
+            while self._parse_cache_bytes > self.PARSE_CACHE_MAX_BYTES:
+                _, (_, evicted_size) = self._parse_cache.popitem(last=False)
+                self._parse_cache_bytes -= evicted_size
+        return doc
+    
+    def _parse_tei_bytes(self, xml_content: bytes, encoding: Optional[str] = None) -> TEIDocument:
+        """Parse encoded TEI XML and extract its metadata and text elements.
+
+        ``encoding`` overrides the encoding named in the XML declaration.
+        """
         try:
-            root = ET.fromstring(xml_content)
+            root = ET.fromstring(xml_content, _parser(encoding))
             
             # Extract language from profileDesc or default to 'unknown'
             language = self._extract_language(root)
@@ -52,7 +184,7 @@ class TEIService:
             title = self._extract_title(root)
             
             # Extract header
-            header = root.find('.//tei:teiHeader', self.ns)
+            header = _first(_XP_HEADER, root)
             
             # Extract text elements (paragraphs, heads, etc.)
             text_elements = self._extract_text_elements(root)
@@ -71,14 +203,14 @@ class TEIService:
     
     def _extract_language(self, root: Element) -> str:
         """Extract language code from TEI header."""
-        lang_elem = root.find('.//tei:profileDesc/tei:langUsage/tei:language', self.ns)
+        lang_elem = _first(_XP_DOC_LANGUAGE, root)
         if lang_elem is not None and 'ident' in lang_elem.attrib:
             return lang_elem.attrib['ident']
         return 'unknown'
     
     def _extract_title(self, root: Element) -> str:
         """Extract title from TEI header."""
-        title_elem = root.find('.//tei:titleStmt/tei:title', self.ns)
+        title_elem = _first(_XP_TITLE, root)
         if title_elem is not None and title_elem.text:
             return title_elem.text.strip()
         return 'Untitled'
@@ -86,13 +218,14 @@ class TEIService:
     def _extract_text_elements(self, root: Element) -> List[TEIElement]:
         """Extract all text-containing elements from TEI body."""
         text_elements = []
-        body = root.find('.//tei:body', self.ns)
+        body = _first(_XP_BODY, root)
         
-        if body is None:
+        # Nothing to walk in a missing or childless body (header-only documents)
+        if body is None or len(body) == 0:
             return text_elements
         
         # Find all text-containing elements (p, head, etc.)
-        for elem in body.iter():
+        for elem in body.iter(ET.Element):
             if elem.tag.endswith('}p') or elem.tag.endswith('}head'):
                 # Clean and join all text content
                 text_content = self._get_element_text(elem)
@@ -111,32 +244,17 @@ class TEIService:
     
     def _get_element_text(self, element: Element) -> str:
         """Extract all text content from element and its children."""
-        texts = []
-        if element.text:
-            texts.append(element.text.strip())
-        
-        for child in element:
-            child_text = self._get_element_text(child)
-            if child_text:
-                texts.append(child_text)
-            if child.tail:
-                texts.append(child.tail.strip())
-
-        return self._clean_text(' '.join(texts).strip())
+        # Text nodes are joined with a space so that markup boundaries separate
+        # words, as before; _clean_text collapses the surplus whitespace
+        return self._clean_text(' '.join(element.itertext()))
     
     def _clean_text(self, text: str) -> str:
         """Clean extracted text by removing line breaks and normalizing whitespace."""
         if not text:
             return text
             
-        # Remove line breaks and carriage returns
-        cleaned = re.sub(r'[\r\n]+', ' ', text)
-        
-        # Replace multiple spaces/tabs with single space
-        cleaned = re.sub(r'\s+', ' ', cleaned)
-        
-        # Strip leading/trailing whitespace
-        return cleaned.strip()
+        # One pass: line breaks, tabs and runs of spaces all collapse to a single space
+        return _WHITESPACE_RE.sub(' ', text).strip()
     
     def _get_element_path(self, element: Element) -> str:
         """Get the structural path to this element."""
@@ -145,8 +263,9 @@ class TEIService:
         
         while current is not None:
             tag = current.tag.split('}')[-1]  # Remove namespace
-            if 'xml:id' in current.attrib:
-                path_parts.append(f"{tag}[@xml:id='{current.attrib['{http://www.w3.org/XML/1998/namespace}id']}']")
+            xml_id = current.get(XML_ID)
+            if xml_id is not None:
+                path_parts.append(f"{tag}[@xml:id='{xml_id}']")
             elif 'type' in current.attrib:
                 path_parts.append(f"{tag}[@type='{current.attrib['type']}']")
             else:
@@ -162,49 +281,110 @@ class TEIService:
                            target_language: Optional[str] = None) -> Dict[str, Any]:
         """Align two TEI documents and return alignment result."""
         try:
-            # Parse both documents
+            # Parse both documents on this thread: text extraction holds the GIL and
+            # dominates parse time, so overlapping the two parses on a worker thread
+            # gains nothing up to MAX_TEI_LEN and a per-call pool only adds its startup
             source_doc = self.parse_tei_file(source_xml)
             target_doc = self.parse_tei_file(target_xml)
             
-            # Use provided languages or fall back to extracted ones, with defaults
-            final_source_lang = source_language or (source_doc.language if source_doc.language != 'unknown' else 'en')
-            final_target_lang = target_language or (target_doc.language if target_doc.language != 'unknown' else 'en')
-            
-            # Extract texts for alignment (properly handle paragraphs)
-            source_texts = [elem.text.strip() for elem in source_doc.text_elements if elem.text and elem.text.strip()]
-            target_texts = [elem.text.strip() for elem in target_doc.text_elements if elem.text and elem.text.strip()]
-            
-            # Create alignment request with proper text handling
-            from app.models import AlignmentRequest
-            alignment_request = AlignmentRequest(
-                source_text='\n\n'.join(source_texts),  # Use double newlines to separate paragraphs
-                target_text='\n\n'.join(target_texts),
-                source_language=final_source_lang,
-                target_language=final_target_lang,
-                is_split=False  # Let bertalign handle sentence splitting
+            alignment_request = self._build_alignment_request(
+                source_doc, target_doc, source_language, target_language
             )
             
             # Perform alignment
             alignment_result = self.bertalign_service.align_texts(alignment_request)
             
-            # Generate aligned TEI output
-            aligned_xml = self._generate_aligned_tei(
-                source_doc, target_doc, alignment_result.alignments,
-                final_source_lang, final_target_lang
-            )
-            
-            return {
-                'aligned_xml': aligned_xml,
-                'source_language': final_source_lang,
-                'target_language': final_target_lang,
-                'alignment_count': len(alignment_result.alignments),
-                'processing_time': alignment_result.processing_time
-            }
+            return self._build_alignment_result(source_doc, target_doc, alignment_request, alignment_result)
             
         except Exception as e:
             logger.error(f"TEI alignment failed: {e}")
             raise
     
+    def align_tei_documents_batch(self, pairs: List[Tuple[str, str]],
+                                  languages: Optional[List[Tuple[Optional[str], Optional[str]]]] = None
+                                  ) -> List[Dict[str, Any]]:
+        """Align several independent pairs of TEI documents, preserving order.
+
+        ``languages`` optionally gives the (source, target) language codes for
+        each pair; missing codes fall back to the documents' own. All documents
+        are parsed concurrently and the alignments go to the Bertalign service
+        as one batch. Each pair is aligned on its own, so sentences are never
+        matched across pairs.
+        """
+        try:
+            if languages is None:
+                languages = [(None, None)] * len(pairs)
+            elif len(languages) != len(pairs):
+                raise ValueError(
+                    f"Expected one language pair per document pair, got {len(languages)} for {len(pairs)}"
+                )
+            
+            documents = [xml for pair in pairs for xml in pair]
+            with ThreadPoolExecutor(max_workers=min(len(documents), 8) or 1) as executor:
+                parsed = list(executor.map(self.parse_tei_file, documents))
+            doc_pairs = list(zip(parsed[::2], parsed[1::2]))
+            
+            alignment_requests = [
+                self._build_alignment_request(source_doc, target_doc, source_language, target_language)
+                for (source_doc, target_doc), (source_language, target_language) in zip(doc_pairs, languages)
+            ]
+            
+            alignment_results = self.bertalign_service.align_texts_batch(alignment_requests)
+            
+            return [
+                self._build_alignment_result(source_doc, target_doc, alignment_request, alignment_result)
+                for (source_doc, target_doc), alignment_request, alignment_result
+                in zip(doc_pairs, alignment_requests, alignment_results)
+            ]
+            
+        except Exception as e:
+            logger.error(f"Batch TEI alignment failed: {e}")
+            raise
+    
+    def _build_alignment_request(self, source_doc: TEIDocument, target_doc: TEIDocument,
+                                 source_language: Optional[str],
+                                 target_language: Optional[str]) -> AlignmentRequest:
+        """Build the Bertalign request for a pair of parsed TEI documents."""
+        # Use provided languages or fall back to extracted ones, with defaults
+        final_source_lang = source_language or (source_doc.language if source_doc.language != 'unknown' else 'en')
+        final_target_lang = target_language or (target_doc.language if target_doc.language != 'unknown' else 'en')
+        
+        # Extract texts for alignment (properly handle paragraphs)
+        source_texts = [elem.text.strip() for elem in source_doc.text_elements if elem.text and elem.text.strip()]
+        target_texts = [elem.text.strip() for elem in target_doc.text_elements if elem.text and elem.text.strip()]
+        
+        # Create alignment request with proper text handling
+        return AlignmentRequest(
+            source_text='\n\n'.join(source_texts),  # Use double newlines to separate paragraphs
+            target_text='\n\n'.join(target_texts),
+            source_language=final_source_lang,
+            target_language=final_target_lang,
+            is_split=False  # Let bertalign handle sentence splitting
+        )
+    
+    def _build_alignment_result(self, source_doc: TEIDocument, target_doc: TEIDocument,
+                                alignment_request: AlignmentRequest,
+                                alignment_result: AlignmentResponse) -> Dict[str, Any]:
+        """Generate the aligned TEI output and the result dict for one document pair."""
+        final_source_lang = alignment_request.source_language
+        final_target_lang = alignment_request.target_language
+        
+        # Generate aligned TEI output; the tree is kept so internal callers can
+        # inspect it without reparsing the serialized form
+        aligned_tree, aligned_xml = self._generate_aligned_tei(
+            source_doc, target_doc, alignment_result.alignments,
+            final_source_lang, final_target_lang
+        )
+        
+        return {
+            'aligned_xml': aligned_xml,
+            'aligned_tree': aligned_tree,
+            'source_language': final_source_lang,
+            'target_language': final_target_lang,
+            'alignment_count': len(alignment_result.alignments),
+            'processing_time': alignment_result.processing_time
+        }
+    
     def _create_enhanced_alignment_map(self, source_doc: TEIDocument, target_doc: TEIDocument, 
                                       alignments: List[AlignmentPair]) -> Dict[str, Any]:
         """Create enhanced alignment mapping that preserves original XML structure."""
@@ -214,6 +394,7 @@ class TEIService:
             'target_elements': {},  # element_text -> {'uuid': str, 'element': TEIElement, 'alignment_type': str}
             'alignment_groups': []  # Track groups of aligned segments for linkGrp generation
         }
+        new_id = _id_generator()
         
         # Create mapping of original text elements
         source_text_to_element = {elem.text.strip(): elem for elem in source_doc.text_elements if elem.text and elem.text.strip()}
@@ -240,7 +421,7 @@ class TEIService:
 
             # Store combined alignment text (handles cases like headers spanning multiple sentences)
             if source_element:
-                combined_uuid = str(uuid.uuid4())
+                combined_uuid = new_id()
                 source_alignment_type = self._determine_alignment_type(source_text, source_element)
                 alignment_map['source_elements'][source_text] = {
                     'uuid': combined_uuid,
@@ -252,7 +433,7 @@ class TEIService:
                 alignment_group['source_texts'].append(source_text)
             
             if target_element:
-                combined_uuid = str(uuid.uuid4())
+                combined_uuid = new_id()
                 target_alignment_type = self._determine_alignment_type(target_text, target_element)
                 alignment_map['target_elements'][target_text] = {
                     'uuid': combined_uuid,
@@ -270,7 +451,7 @@ class TEIService:
                 if sentence and sentence not in alignment_map['source_elements']:
                     source_element = self._find_best_matching_element(sentence, source_text_to_element)
                     if source_element:
-                        sentence_uuid = str(uuid.uuid4())  # Generate unique UUID for each sentence
+                        sentence_uuid = new_id()  # Generate unique id for each sentence
                         source_alignment_type = self._determine_alignment_type(sentence, source_element)
                         alignment_map['source_elements'][sentence] = {
                             'uuid': sentence_uuid,
@@ -286,7 +467,7 @@ class TEIService:
                 if sentence and sentence not in alignment_map['target_elements']:
                     target_element = self._find_best_matching_element(sentence, target_text_to_element)
                     if target_element:
-                        sentence_uuid = str(uuid.uuid4())  # Generate unique UUID for each sentence
+                        sentence_uuid = new_id()  # Generate unique id for each sentence
                         target_alignment_type = self._determine_alignment_type(sentence, target_element)
                         alignment_map['target_elements'][sentence] = {
                             'uuid': sentence_uuid,
@@ -341,40 +522,41 @@ class TEIService:
         return 'paragraph'
 
     def _generate_aligned_tei(self, source_doc: TEIDocument, target_doc: TEIDocument, 
-                             alignments: List[AlignmentPair], source_language: str, target_language: str) -> str:
-        """Generate aligned TEI XML with teiCorpus structure following TEI P5 guidelines."""
+                             alignments: List[AlignmentPair], source_language: str, target_language: str) -> Tuple[Element, str]:
+        """Generate aligned TEI XML with teiCorpus structure following TEI P5 guidelines.
+
+        Returns the teiCorpus root together with its serialized form."""
         
-        # Register TEI namespace and create root teiCorpus element
-        ET.register_namespace('', 'http://www.tei-c.org/ns/1.0')
-        root = ET.Element('{http://www.tei-c.org/ns/1.0}teiCorpus')
+        # Create root teiCorpus element with TEI as the default namespace
+        root = ET.Element(_tei('teiCorpus'), nsmap={None: TEI_NS})
         root.set('version', '3.3.0')
         
         # Add comprehensive corpus-level header
-        header = ET.SubElement(root, 'teiHeader')
-        file_desc = ET.SubElement(header, 'fileDesc')
-        title_stmt = ET.SubElement(file_desc, 'titleStmt')
-        title_elem = ET.SubElement(title_stmt, 'title')
+        header = ET.SubElement(root, _tei('teiHeader'))
+        file_desc = ET.SubElement(header, _tei('fileDesc'))
+        title_stmt = ET.SubElement(file_desc, _tei('titleStmt'))
+        title_elem = ET.SubElement(title_stmt, _tei('title'))
         title_elem.text = "Aligned Parallel Texts"
         
-        pub_stmt = ET.SubElement(file_desc, 'publicationStmt')
-        pub_p = ET.SubElement(pub_stmt, 'p')
+        pub_stmt = ET.SubElement(file_desc, _tei('publicationStmt'))
+        pub_p = ET.SubElement(pub_stmt, _tei('p'))
         pub_p.text = "Aligned using Bertalign API"
         
         # Add profile description with languages
-        profile_desc = ET.SubElement(header, 'profileDesc')
-        lang_usage = ET.SubElement(profile_desc, 'langUsage')
+        profile_desc = ET.SubElement(header, _tei('profileDesc'))
+        lang_usage = ET.SubElement(profile_desc, _tei('langUsage'))
         
         # Add both languages to the corpus header
-        source_lang_elem = ET.SubElement(lang_usage, 'language', attrib={'ident': source_language})
+        source_lang_elem = ET.SubElement(lang_usage, _tei('language'), attrib={'ident': source_language})
         source_lang_elem.text = f"Source language: {source_language}"
-        target_lang_elem = ET.SubElement(lang_usage, 'language', attrib={'ident': target_language})
+        target_lang_elem = ET.SubElement(lang_usage, _tei('language'), attrib={'ident': target_language})
         target_lang_elem.text = f"Target language: {target_language}"
         
         # Generate enhanced alignment mapping that handles both paragraph and sentence-level alignments
         alignment_map = self._create_enhanced_alignment_map(source_doc, target_doc, alignments)
         
         # Create standOff with alignment links
-        standoff = ET.SubElement(root, 'standOff')
+        standoff = ET.SubElement(root, _tei('standOff'))
 
         # First, create all join elements and collect link references
         join_counter = 1
@@ -390,9 +572,9 @@ class TEIService:
                 join_id = f"join{join_counter}"
                 join_counter += 1
                 source_targets = ' '.join(f"#{uuid}" for uuid in source_uuids)
-                ET.SubElement(standoff, 'join', attrib={
+                ET.SubElement(standoff, _tei('join'), attrib={
                     'target': source_targets,
-                    'xml:id': join_id,
+                    XML_ID: join_id,
                     'type': 'Linguistic'
                 })
                 source_ref = f"#{join_id}"
@@ -406,9 +588,9 @@ class TEIService:
                 join_id = f"join{join_counter}"
                 join_counter += 1
                 target_targets = ' '.join(f"#{uuid}" for uuid in target_uuids)
-                ET.SubElement(standoff, 'join', attrib={
+                ET.SubElement(standoff, _tei('join'), attrib={
                     'target': target_targets,
-                    'xml:id': join_id,
+                    XML_ID: join_id,
                     'type': 'Linguistic'
                 })
                 target_ref = f"#{join_id}"
@@ -420,9 +602,9 @@ class TEIService:
             link_references.append((source_ref, target_ref))
 
         # Then create linkGrp and all link elements
-        link_grp = ET.SubElement(standoff, 'linkGrp', attrib={'type': 'translation'})
+        link_grp = ET.SubElement(standoff, _tei('linkGrp'), attrib={'type': 'translation'})
         for source_ref, target_ref in link_references:
-            ET.SubElement(link_grp, 'link', attrib={
+            ET.SubElement(link_grp, _tei('link'), attrib={
                 'target': f"{source_ref} {target_ref}",
                 'type': 'Linguistic'
             })
@@ -436,48 +618,60 @@ class TEIService:
         root.append(target_tei_with_ids)
         
         # Convert to string with proper formatting
-        return '<?xml version="1.0" encoding="UTF-8"?>\n' + ET.tostring(root, encoding='unicode')
+        return root, '<?xml version="1.0" encoding="UTF-8"?>\n' + ET.tostring(root, encoding='unicode')
     
     def _create_tei_with_ids(self, doc: TEIDocument, alignment_map: Dict[str, Any], language: str, is_source: bool = True) -> Element:
         """Create TEI element with xml:id attributes for aligned elements and <seg> tags for sentence alignments."""
         
-        # Create a copy of the original document
-        tei_copy = ET.fromstring(ET.tostring(doc.root, encoding='unicode'))
+        # Copy the original document tree directly; the parsed document is shared
+        # through the parse cache and must stay untouched
+        tei_copy = copy.deepcopy(doc.root)
         
         # Add language to profileDesc
-        profile_desc = tei_copy.find('.//tei:profileDesc', self.ns)
+        profile_desc = _first(_XP_PROFILE_DESC, tei_copy)
         if profile_desc is None:
-            profile_desc = ET.SubElement(tei_copy.find('.//tei:teiHeader', self.ns), 'profileDesc')
+            profile_desc = ET.SubElement(_first(_XP_HEADER, tei_copy), _tei('profileDesc'))
         
-        lang_usage = profile_desc.find('.//tei:langUsage', self.ns)
+        lang_usage = _first(_XP_LANG_USAGE, profile_desc)
         if lang_usage is None:
-            lang_usage = ET.SubElement(profile_desc, 'langUsage')
+            lang_usage = ET.SubElement(profile_desc, _tei('langUsage'))
         
         # Clear existing language elements and add the correct one
-        for existing_lang in lang_usage.findall('.//tei:language', self.ns):
+        for existing_lang in _XP_LANGUAGES(lang_usage):
             lang_usage.remove(existing_lang)
         
-        language_elem = ET.SubElement(lang_usage, 'language', attrib={'ident': language})
+        language_elem = ET.SubElement(lang_usage, _tei('language'), attrib={'ident': language})
         language_elem.text = language
         
         # Process alignments with new enhanced format
         elements_map = alignment_map.get('source_elements', {}) if is_source else alignment_map.get('target_elements', {})
         
         # Always create <seg> tags for all alignments regardless of element type or alignment granularity
-        body = tei_copy.find('.//tei:body', self.ns)
+        # Normalize every aligned text once instead of once per candidate element
+        aligned_candidates = [
+            (aligned_text, ' '.join(aligned_text.split()), alignment_info)
+            for aligned_text, alignment_info in elements_map.items()
+        ]
+        
+        body = _first(_XP_BODY, tei_copy)
         if body is not None:
-            for elem in body.iter():
+            # Snapshot the elements first: lxml iterators do not survive the
+            # element.clear() done while inserting <seg> tags
+            for elem in list(body.iter(ET.Element)):
                 if elem.tag.endswith('}p') or elem.tag.endswith('}head'):
                     elem_text = self._get_element_text(elem)
                     if elem_text and elem_text.strip():
                         elem_text_clean = elem_text.strip()
+                        elem_text_norm = ' '.join(elem_text_clean.split())
                         
-                        # Collect all alignments that match this element
-                        all_matches = []
-                        
-                        for aligned_text, alignment_info in elements_map.items():
-                            if self._texts_match(elem_text_clean, aligned_text) or aligned_text in elem_text_clean:
-                                all_matches.append(alignment_info)
+                        # Collect all alignments that match this element; the plain
+                        # containment test is cheaper, so it runs first
+                        all_matches = [
+                            alignment_info
+                            for aligned_text, aligned_norm, alignment_info in aligned_candidates
+                            if aligned_text in elem_text_clean
+                            or self._normalized_texts_match(elem_text_norm, aligned_norm)
+                        ]
                         
                         # Always create <seg> tags for any matches found
                         if all_matches:
@@ -485,9 +679,9 @@ class TEIService:
         
         # Fallback for old alignment map format (simple text -> uuid mapping)
         if not elements_map and isinstance(alignment_map, dict):
-            body = tei_copy.find('.//tei:body', self.ns)
+            body = _first(_XP_BODY, tei_copy)
             if body is not None:
-                for elem in body.iter():
+                for elem in list(body.iter(ET.Element)):
                     if elem.tag.endswith('}p') or elem.tag.endswith('}head'):
                         elem_text = self._get_element_text(elem)
                         if elem_text and elem_text.strip() in alignment_map:
@@ -500,16 +694,18 @@ class TEIService:
                             self._create_seg_tags_for_sentences(elem, fallback_match, elem_text.strip())
         
         # Add empty facsimile element
-        ET.SubElement(tei_copy, 'facsimile')
+        ET.SubElement(tei_copy, _tei('facsimile'))
         
         return tei_copy
     
     def _texts_match(self, text1: str, text2: str) -> bool:
         """Check if two texts match with some tolerance for whitespace and punctuation."""
         # Normalize whitespace and compare
-        norm1 = ' '.join(text1.split())
-        norm2 = ' '.join(text2.split())
-        
+        return self._normalized_texts_match(' '.join(text1.split()), ' '.join(text2.split()))
+    
+    @staticmethod
+    def _normalized_texts_match(norm1: str, norm2: str) -> bool:
+        """Compare two texts whose whitespace is already normalized."""
         # Try exact match first
         if norm1 == norm2:
             return True
@@ -529,29 +725,25 @@ class TEIService:
         sentences_to_segment = []
         for match in sentence_matches:
             for sentence in match['aligned_sentences']:
-                if sentence.strip() and sentence.strip() in full_text:
+                sentence = sentence.strip()
+                if sentence and sentence in full_text:
                     # Look up the individual sentence's UUID from elements_map
-                    sentence_uuid = match['uuid']  # default fallback
-                    if elements_map and sentence.strip() in elements_map:
-                        sentence_uuid = elements_map[sentence.strip()]['uuid']
+                    sentence_info = elements_map.get(sentence) if elements_map else None
+                    sentence_uuid = sentence_info['uuid'] if sentence_info else match['uuid']
 
                     sentences_to_segment.append({
-                        'text': sentence.strip(),
+                        'text': sentence,
                         'uuid': sentence_uuid
                     })
 
         if not sentences_to_segment:
             # Fallback: assign first sentence UUID to element (should not happen with new approach)
-            elem.set('{http://www.w3.org/XML/1998/namespace}id', sentence_matches[0]['uuid'])
+            elem.set(XML_ID, sentence_matches[0]['uuid'])
             return
         
-        # Clear the element content
-        original_text = elem.text or ""
-        original_tail = elem.tail
-        elem.clear()
-        elem.tail = original_tail
-        
-        # Process the text and create seg elements
+        # Lay out the new content first: leading text, then [uuid, text, tail] per seg
+        lead_text = None
+        segs = []
         remaining_text = full_text
         
         for i, sentence_info in enumerate(sentences_to_segment):
@@ -567,17 +759,12 @@ class TEIService:
                     before_text = remaining_text[:sentence_start].strip()
                     if before_text:
                         if i == 0:
-                            elem.text = before_text + " "
-                        else:
-                            # Add to tail of previous element
-                            if len(elem) > 0:
-                                prev_elem = elem[-1]
-                                prev_elem.tail = (prev_elem.tail or "") + before_text + " "
+                            lead_text = before_text + " "
+                        elif segs:
+                            # Add to tail of previous seg
+                            segs[-1][2] = (segs[-1][2] or "") + before_text + " "
                 
-                # Create seg element for this sentence
-                seg_elem = ET.SubElement(elem, '{http://www.tei-c.org/ns/1.0}seg')
-                seg_elem.set('{http://www.w3.org/XML/1998/namespace}id', sentence_uuid)
-                seg_elem.text = sentence_text
+                segs.append([sentence_uuid, sentence_text, None])
                 
                 # Update remaining text
                 sentence_end = sentence_start + len(sentence_text)
@@ -585,8 +772,20 @@ class TEIService:
         
         # Add any remaining text after the last sentence
         if remaining_text.strip():
-            if len(elem) > 0:
-                last_seg = elem[-1]
-                last_seg.tail = " " + remaining_text.strip()
+            if segs:
+                segs[-1][2] = " " + remaining_text.strip()
             else:
-                elem.text = (elem.text or "") + remaining_text.strip()
\ No newline at end of file
+                lead_text = (lead_text or "") + remaining_text.strip()
+        
+        # Replace the element content; the segs are written as one markup string and
+        # parsed in C, which beats a SubElement/set/text round trip per sentence
+        original_tail = elem.tail
+        elem.clear()
+        elem.tail = original_tail
+        elem.text = lead_text
+        if segs:
+            markup = ''.join(
+                f'<seg xml:id={quoteattr(uuid)}>{escape(text)}</seg>{escape(tail or "")}'
+                for uuid, text, tail in segs
+            )
+            elem.extend(ET.fromstring(f'<p xmlns="{TEI_NS}">{markup}</p>', _parser()))
\ No newline at end of file
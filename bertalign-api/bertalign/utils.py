@@ -1,6 +1,11 @@
 import re
+from functools import lru_cache
 from sentence_splitter import SentenceSplitter
 
+_WHITESPACE_RE = re.compile(r'\s+')
+_ZH_STOP_RE = re.compile('(?P<quotation_mark>([。？！](?![”’"\'）])))')
+_ZH_QUOTE_RE = re.compile('(?P<quotation_mark>([。？！]|…{1,2})[”’"\'）])')
+
 def clean_text(text):
     clean_text = []
     text = text.strip()
@@ -8,7 +13,7 @@ def clean_text(text):
     for line in lines:
         line = line.strip()
         if line:
-            line = re.sub('\s+', ' ', line)
+            line = _WHITESPACE_RE.sub(' ', line)
             clean_text.append(line)
     return "\n".join(clean_text)
     
@@ -19,17 +24,22 @@ def split_sents(text, lang):
         if lang == 'zh':
             sents = _split_zh(text)
         else:
-            splitter = SentenceSplitter(language=lang)
+            splitter = _get_splitter(lang)
             sents = splitter.split(text=text) 
             sents = [sent.strip() for sent in sents]
         return sents
     else:
         raise Exception('The language {} is not suppored yet.'.format(LANG.ISO[lang]))
+
+@lru_cache(maxsize=None)
+def _get_splitter(lang):
+    # Building a splitter loads and compiles the language's non-breaking prefixes
+    return SentenceSplitter(language=lang)
     
 def _split_zh(text, limit=1000):
         sent_list = []
-        text = re.sub('(?P<quotation_mark>([。？！](?![”’"\'）])))', r'\g<quotation_mark>\n', text)
-        text = re.sub('(?P<quotation_mark>([。？！]|…{1,2})[”’"\'）])', r'\g<quotation_mark>\n', text)
+        text = _ZH_STOP_RE.sub(r'\g<quotation_mark>\n', text)
+        text = _ZH_QUOTE_RE.sub(r'\g<quotation_mark>\n', text)
 
         sent_list_ori = text.splitlines()
         for sent in sent_list_ori:
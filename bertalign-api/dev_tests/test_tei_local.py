@@ -30,11 +30,8 @@ def test_with_actual_files():
         pytest.skip(f"Test files not found: {italian_file} or {english_file}")
     
     # Load files
-    with open(italian_file, 'r', encoding='utf-8') as f:
-        italian_xml = f.read()
-    
-    with open(english_file, 'r', encoding='utf-8') as f:
-        english_xml = f.read()
+    italian_xml = italian_file.read_text(encoding='utf-8')
+    english_xml = english_file.read_text(encoding='utf-8')
     
     # Verify files were loaded
     assert len(italian_xml) > 100, "Italian XML file appears to be empty or too small"
@@ -79,11 +79,8 @@ def test_tei_alignment():
         pytest.skip(f"Test files not found: {italian_file} or {english_file}")
     
     # Load actual test files
-    with open(italian_file, 'r', encoding='utf-8') as f:
-        italian_tei = f.read()
-    
-    with open(english_file, 'r', encoding='utf-8') as f:
-        english_tei = f.read()
+    italian_tei = italian_file.read_text(encoding='utf-8')
+    english_tei = english_file.read_text(encoding='utf-8')
     
     # Verify files were loaded
     assert len(italian_tei) > 100, "Italian TEI file appears to be empty or too small"
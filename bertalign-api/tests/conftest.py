@@ -5,9 +5,24 @@ This module provides shared fixtures and configuration for all test modules.
 Organized to support both basic alignment and TEI XML alignment testing.
 """
 
+from pathlib import Path
+from unittest.mock import Mock
+
+import httpx
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
+from lxml import etree
 from app.main import app
+from app.models import AlignmentPair, AlignmentResponse
+from app.routers.alignment import get_bertalign_service, get_tei_service
+from app.services.bertalign_service import BertalignService
+from app.services.tei_service import TEIService
+
+
+def pytest_collection_modifyitems(config, items):
+    """Run tests marked ``slow`` first so xdist starts the long alignments early."""
+    items.sort(key=lambda item: item.get_closest_marker("slow") is None)
 
 
 # =============================================================================
@@ -16,17 +31,82 @@ from app.main import app
 
 @pytest.fixture(scope="session")
 def client():
-    """Test client for the FastAPI app (session-scoped for efficiency)."""
-    return TestClient(app)
+    """Test client for the FastAPI app (session-scoped for efficiency).
+
+    Under pytest-xdist every worker builds its own session, so the model is
+    loaded once per worker rather than once per test.
+    """
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+class _RejectingBertalignService:
+    """Stand-in service that fails loudly if a request gets past validation."""
+
+    @staticmethod
+    def align_texts(request):
+        raise NotImplementedError("validation tests must not reach alignment")
+
+    @staticmethod
+    def align_texts_batch(requests):
+        raise NotImplementedError("validation tests must not reach alignment")
+
+
+@pytest.fixture
+def validation_client(client):
+    """Session client whose alignment services never run the model.
+
+    Request validation, XML parsing and error mapping still go through the
+    real app; only the Bertalign service behind the router is replaced.
+    """
+    stub = _RejectingBertalignService()
+    app.dependency_overrides[get_bertalign_service] = lambda: stub
+    app.dependency_overrides[get_tei_service] = lambda: TEIService(stub)
+    yield client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(scope="session")
+def _warm_up_model(client):
+    """Send one tiny alignment before the first ``model`` test runs.
+
+    Keeps first-call latency (tokenizer load, lazy imports, first kernels)
+    out of the timing assertions in the performance tests. Model-marked test
+    classes request it with ``pytest.mark.usefixtures``, so only workers that
+    run real alignments pay for the warm-up request.
+    """
+    client.post("/align", json={
+        "source_text": "Hi.",
+        "target_text": "Bonjour.",
+        "source_language": "en",
+        "target_language": "fr"
+    })
+
+
+@pytest_asyncio.fixture
+async def async_client():
+    """Async client for the FastAPI app.
+
+    ASGITransport drives the app coroutine directly on the test's event loop,
+    skipping TestClient's sync-to-async bridge; prefer it for alignment tests
+    and keep the sync ``client`` for simple GET checks.
+    """
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as test_client:
+        yield test_client
 
 
 # =============================================================================
 # Basic Alignment Test Data
 # =============================================================================
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def basic_alignment_request():
-    """Basic alignment request for standard testing."""
+    """Basic alignment request for standard testing.
+
+    Session-scoped and shared between tests: build a new dict
+    (``{**basic_alignment_request, ...}``) instead of mutating it.
+    """
     return {
         "source_text": "Hello world. This is a test.",
         "target_text": "Bonjour le monde. Ceci est un test.",
@@ -87,7 +167,9 @@ def pre_split_request():
 # TEI XML Test Data
 # =============================================================================
 
-@pytest.fixture
+# The TEI documents are immutable strings, so they are built once per session.
+
+@pytest.fixture(scope="session")
 def simple_italian_tei():
     """Simple Italian TEI document for testing."""
     return '''<?xml version="1.0" encoding="UTF-8"?>
@@ -103,7 +185,7 @@ def simple_italian_tei():
     <text><body><div><p>Ciao mondo.</p></div></body></text>
 </TEI>'''
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def simple_english_tei():
     """Simple English TEI document for testing."""
     return '''<?xml version="1.0" encoding="UTF-8"?>
@@ -119,17 +201,146 @@ def simple_english_tei():
     <text><body><div><p>Hello world.</p></div></body></text>
 </TEI>'''
 
+@pytest.fixture(scope="session")
+def unknown_language_italian_tei(simple_italian_tei):
+    """Italian TEI document whose metadata declares an unknown language."""
+    return simple_italian_tei.replace('ident="it"', 'ident="unknown"')
+
+@pytest.fixture(scope="session")
+def unknown_language_english_tei(simple_english_tei):
+    """English TEI document whose metadata declares an unknown language."""
+    return simple_english_tei.replace('ident="en"', 'ident="unknown"')
+
 @pytest.fixture
 def basic_tei_request(simple_italian_tei, simple_english_tei):
     """Basic TEI alignment request."""
     return {
-        "source_tei": simple_italian_tei,
-        "target_tei": simple_english_tei,
-        "source_language": "it",
-        "target_language": "en"
+        "languageA": simple_italian_tei,
+        "languageB": simple_english_tei,
+        "languageA_name": "it",
+        "languageB_name": "en"
     }
 
 
+# =============================================================================
+# Real TEI Corpus (integration tests)
+# =============================================================================
+
+@pytest.fixture(scope="session")
+def bertalign_service():
+    """Real Bertalign service; stateless, so one instance serves the session."""
+    return BertalignService()
+
+@pytest.fixture(scope="session")
+def tei_service(bertalign_service):
+    """Real TEI service backed by the shared Bertalign service."""
+    return TEIService(bertalign_service)
+
+@pytest.fixture(scope="session")
+def texts_dir():
+    """Directory holding the sample TEI documents."""
+    return Path(__file__).parent.parent / 'texts'
+
+@pytest.fixture(scope="session")
+def corpus_bytes(texts_dir):
+    """The Italian and English sample TEI documents as raw bytes, read from disk once."""
+    return (
+        texts_dir.joinpath('italian.xml').read_bytes(),
+        texts_dir.joinpath('english.xml').read_bytes(),
+    )
+
+@pytest.fixture(scope="session")
+def corpus_xml(corpus_bytes):
+    """The Italian and English sample TEI documents as strings."""
+    italian_bytes, english_bytes = corpus_bytes
+    return italian_bytes.decode('utf-8'), english_bytes.decode('utf-8')
+
+def _align_corpus(service, corpus_xml):
+    """Align the sample corpus with ``service``, returning the aligned tree with the result."""
+    italian_xml, english_xml = corpus_xml
+    result = service.align_tei_documents(italian_xml, english_xml, 'it', 'en')
+    return italian_xml, english_xml, result, result['aligned_tree']
+
+@pytest.fixture(scope="session")
+def aligned_corpus(tei_service, corpus_xml):
+    """Align the sample corpus once and share ``(italian, english, result, root)``.
+
+    The aligned XML is encoded and parsed here, once; ``root`` is the parsed
+    teiCorpus and tests must treat it as read-only.
+    """
+    return _align_corpus(tei_service, corpus_xml)
+
+def _paragraph_alignment(request):
+    """Pair the request's paragraphs one-to-one, as a model-free alignment."""
+    source = request.source_text.split('\n\n')
+    target = request.target_text.split('\n\n')
+    alignments = [
+        AlignmentPair(
+            source_sentences=[src],
+            target_sentences=[tgt],
+            source_indices=[i],
+            target_indices=[i],
+            alignment_score=0.0
+        )
+        for i, (src, tgt) in enumerate(zip(source, target))
+    ]
+    return AlignmentResponse(
+        alignments=alignments,
+        source_language=request.source_language,
+        target_language=request.target_language,
+        processing_time=0.001,
+        total_source_sentences=len(source),
+        total_target_sentences=len(target),
+        parameters=request
+    )
+
+_MOCK_ATTRIBUTES = {
+    'max_align': 5,
+    'top_k': 3,
+    'win': 5,
+    'skip': -0.1,
+    'margin': True,
+    'len_penalty': True,
+}
+
+
+class _StubBertalignService:
+    """Plain stand-in for BertalignService; only the alignment calls are mocks."""
+
+    def __init__(self):
+        self.align_texts = Mock()
+        self.align_texts_batch = Mock()
+        self.reset()
+
+    def reset(self):
+        """Restore the default parameters and forget calls, return values and side effects."""
+        for name, value in _MOCK_ATTRIBUTES.items():
+            setattr(self, name, value)
+        for method in (self.align_texts, self.align_texts_batch):
+            method.reset_mock(return_value=True, side_effect=True)
+
+
+@pytest.fixture(scope="session")
+def bertalign_stub_factory():
+    """Callable that builds a fresh Bertalign stub for tests that never run the model."""
+    return _StubBertalignService
+
+@pytest.fixture(scope="session")
+def stub_tei_service(bertalign_stub_factory):
+    """TEI service whose Bertalign backend pairs paragraphs without the model.
+
+    For tests that check corpus structure rather than alignment quality.
+    """
+    stub_bertalign = bertalign_stub_factory()
+    stub_bertalign.align_texts.side_effect = _paragraph_alignment
+    return TEIService(stub_bertalign)
+
+@pytest.fixture(scope="session")
+def stub_aligned_corpus(stub_tei_service, corpus_xml):
+    """Like ``aligned_corpus``, but produced by ``stub_tei_service``."""
+    return _align_corpus(stub_tei_service, corpus_xml)
+
+
 # =============================================================================
 # Legacy Fixtures (for backward compatibility)
 # =============================================================================
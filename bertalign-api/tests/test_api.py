@@ -10,9 +10,79 @@ This module contains tests for all REST API endpoints including:
 Organized into logical test classes for better structure.
 """
 
+import asyncio
+import orjson
 import pytest
 import time
 from fastapi.testclient import TestClient
+from lxml import etree
+
+from app.main import app
+
+
+# Namespaces and precompiled XPath expressions for the TEI response checks
+NS = {
+    "tei": "http://www.tei-c.org/ns/1.0",
+    "xml": "http://www.w3.org/XML/1998/namespace",
+}
+_TEI_XPATH = etree.XPath(".//tei:TEI", namespaces=NS)
+_P_XPATH = etree.XPath(".//tei:p", namespaces=NS)
+_SEG_XPATH = etree.XPath(".//tei:seg", namespaces=NS)
+_XMLID_XPATH = etree.XPath("string(@xml:id)", namespaces=NS)
+# The aligned corpus holds both documents, whose own xml:ids may repeat across
+# them; libxml2 rejects duplicate ids unless it is told not to collect them
+_PARSER = etree.XMLParser(collect_ids=False)
+
+# Documents with multi-sentence paragraphs for the seg-tag test
+_ITALIAN_TEI_MULTI = '''<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0">
+    <teiHeader>
+        <fileDesc>
+            <titleStmt><title>Test Document</title></titleStmt>
+        </fileDesc>
+        <profileDesc>
+            <langUsage><language ident="it">Italian</language></langUsage>
+        </profileDesc>
+    </teiHeader>
+    <text>
+        <body>
+            <p>Prima frase del test. Seconda frase molto diversa. Terza frase finale.</p>
+        </body>
+    </text>
+</TEI>'''
+
+_ENGLISH_TEI_MULTI = '''<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0">
+    <teiHeader>
+        <fileDesc>
+            <titleStmt><title>Test Document</title></titleStmt>
+        </fileDesc>
+        <profileDesc>
+            <langUsage><language ident="en">English</language></langUsage>
+        </profileDesc>
+    </teiHeader>
+    <text>
+        <body>
+            <p>First test sentence. Completely different second sentence. Final third sentence.</p>
+        </body>
+    </text>
+</TEI>'''
+
+
+def post_json(client, url, payload):
+    """POST ``payload`` serialized with orjson (works for sync and async clients)."""
+    return client.post(url, content=orjson.dumps(payload), headers={"content-type": "application/json"})
+
+
+def get_json(response):
+    """Decode a response body with orjson."""
+    return orjson.loads(response.content)
+
+
+def _parse_tei(aligned_xml):
+    """Parse an aligned teiCorpus once and return ``(root, tei_documents)``."""
+    root = etree.fromstring(aligned_xml.encode(), _PARSER)
+    return root, _TEI_XPATH(root)
 
 
 class TestHealthEndpoint:
@@ -23,7 +93,7 @@ class TestHealthEndpoint:
         response = client.get("/health")
         assert response.status_code == 200
         
-        data = response.json()
+        data = get_json(response)
         assert data["status"] == "healthy"
         assert "version" in data
         assert "model_loaded" in data
@@ -33,22 +103,24 @@ class TestHealthEndpoint:
         response = client.get("/")
         assert response.status_code == 200
         
-        data = response.json()
+        data = get_json(response)
         assert "message" in data
         assert "version" in data
         assert "endpoints" in data
         assert "supported_languages" in data
 
 
+@pytest.mark.model
+@pytest.mark.usefixtures("_warm_up_model")
 class TestBasicAlignmentEndpoint:
     """Tests for the basic text alignment endpoint."""
     
     def test_basic_alignment_success(self, client, basic_alignment_request):
         """Test basic alignment functionality with valid input."""
-        response = client.post("/align", json=basic_alignment_request)
+        response = post_json(client, "/align", basic_alignment_request)
         assert response.status_code == 200
         
-        data = response.json()
+        data = get_json(response)
         
         # Check required response fields
         assert "alignments" in data
@@ -77,27 +149,33 @@ class TestBasicAlignmentEndpoint:
         # Check score is valid
         assert 0.0 <= alignment["alignment_score"] <= 1.0
 
-    def test_multiple_language_pairs(self, client, multilanguage_test_cases):
-        """Test alignment with different language pairs."""
-        for test_case in multilanguage_test_cases:
-            response = client.post("/align", json={
+    @pytest.mark.asyncio
+    async def test_multiple_language_pairs(self, async_client, multilanguage_test_cases):
+        """Test alignment with different language pairs in a single batch request."""
+        payloads = [
+            {
                 "source_text": test_case["source_text"],
                 "target_text": test_case["target_text"],
                 "source_language": test_case["source_language"],
                 "target_language": test_case["target_language"]
-            })
-            assert response.status_code == 200, f"Failed for {test_case['description']}"
-            
-            data = response.json()
-            assert data["source_language"] == test_case["source_language"]
-            assert data["target_language"] == test_case["target_language"]
+            }
+            for test_case in multilanguage_test_cases
+        ]
+        response = await post_json(async_client, "/align/batch", payloads)
+        assert response.status_code == 200
+        
+        results = get_json(response)
+        assert len(results) == len(multilanguage_test_cases)
+        for test_case, data in zip(multilanguage_test_cases, results):
+            assert data["source_language"] == test_case["source_language"], f"Failed for {test_case['description']}"
+            assert data["target_language"] == test_case["target_language"], f"Failed for {test_case['description']}"
 
     def test_pre_split_sentences(self, client, pre_split_request):
         """Test alignment with pre-split sentences."""
-        response = client.post("/align", json=pre_split_request)
+        response = post_json(client, "/align", pre_split_request)
         assert response.status_code == 200
         
-        data = response.json()
+        data = get_json(response)
         assert data["total_source_sentences"] == 2
         assert data["total_target_sentences"] == 2
         assert data["parameters"]["is_split"] is True
@@ -114,10 +192,10 @@ class TestBasicAlignmentEndpoint:
             "len_penalty": False
         }
         
-        response = client.post("/align", json=custom_request)
+        response = post_json(client, "/align", custom_request)
         assert response.status_code == 200
         
-        data = response.json()
+        data = get_json(response)
         params = data["parameters"]
         assert params["max_align"] == 3
         assert params["top_k"] == 5
@@ -126,32 +204,51 @@ class TestBasicAlignmentEndpoint:
         assert params["margin"] is False
         assert params["len_penalty"] is False
 
-    def test_performance_timing(self, client, medium_alignment_request):
+    @pytest.mark.asyncio
+    async def test_performance_timing(self, async_client, medium_alignment_request):
         """Test alignment performance with medium-sized text."""
-        start_time = time.time()
-        response = client.post("/align", json=medium_alignment_request)
-        end_time = time.time()
+        start_ns = time.perf_counter_ns()
+        response = await post_json(async_client, "/align", medium_alignment_request)
+        elapsed = (time.perf_counter_ns() - start_ns) / 1e9
         
         assert response.status_code == 200
         
-        # Should complete within reasonable time
-        assert end_time - start_time < 5.0  # 5 seconds max
+        # Model is warmed up by conftest, so this measures steady-state cost
+        assert elapsed < 2.0  # 2 seconds max
         
-        data = response.json()
-        # Processing time should be reported and reasonable
+        data = get_json(response)
+        # Processing time should be reported and fit inside the round-trip
         assert data["processing_time"] > 0
-        assert data["processing_time"] < 5.0
+        assert data["processing_time"] <= elapsed + 0.1
 
+    @pytest.mark.asyncio
+    async def test_concurrent_requests(self, async_client, multilanguage_test_cases):
+        """Test that concurrent alignment requests are all served correctly."""
+        payloads = [
+            {key: value for key, value in test_case.items() if key != "description"}
+            for test_case in multilanguage_test_cases
+        ]
+        responses = await asyncio.gather(
+            *(post_json(async_client, "/align", payload) for payload in payloads)
+        )
+        
+        for test_case, response in zip(multilanguage_test_cases, responses):
+            assert response.status_code == 200, f"Failed for {test_case['description']}"
+            data = get_json(response)
+            assert data["source_language"] == test_case["source_language"]
+            assert data["target_language"] == test_case["target_language"]
 
+
+@pytest.mark.fast
 class TestBasicAlignmentValidation:
     """Tests for input validation on basic alignment endpoint."""
     
-    def test_missing_required_fields(self, client):
+    def test_missing_required_fields(self, validation_client):
         """Test alignment endpoint with missing required fields."""
-        response = client.post("/align", json={})
+        response = post_json(validation_client, "/align", {})
         assert response.status_code == 422
     
-    def test_invalid_language_codes(self, client):
+    def test_invalid_language_codes(self, validation_client):
         """Test alignment endpoint with invalid language codes."""
         invalid_request = {
             "source_text": "Hello world.",
@@ -159,7 +256,7 @@ class TestBasicAlignmentValidation:
             "source_language": "invalid",
             "target_language": "fr"
         }
-        response = client.post("/align", json=invalid_request)
+        response = post_json(validation_client, "/align", invalid_request)
         assert response.status_code == 422
         
         # Test invalid target language
@@ -169,10 +266,10 @@ class TestBasicAlignmentValidation:
             "source_language": "en",
             "target_language": "invalid"
         }
-        response = client.post("/align", json=invalid_request)
+        response = post_json(validation_client, "/align", invalid_request)
         assert response.status_code == 422
 
-    def test_empty_text(self, client):
+    def test_empty_text(self, validation_client):
         """Test alignment endpoint with empty text."""
         empty_request = {
             "source_text": "",
@@ -180,7 +277,7 @@ class TestBasicAlignmentValidation:
             "source_language": "en",
             "target_language": "fr"
         }
-        response = client.post("/align", json=empty_request)
+        response = post_json(validation_client, "/align", empty_request)
         assert response.status_code == 422
         
         # Test whitespace only
@@ -190,17 +287,17 @@ class TestBasicAlignmentValidation:
             "source_language": "en",
             "target_language": "fr"
         }
-        response = client.post("/align", json=whitespace_request)
+        response = post_json(validation_client, "/align", whitespace_request)
         assert response.status_code == 422
 
-    def test_parameter_boundaries(self, client, basic_alignment_request):
+    def test_parameter_boundaries(self, validation_client, basic_alignment_request):
         """Test parameter validation boundaries."""
         # Test max_align too high
         invalid_request = {
             **basic_alignment_request,
             "max_align": 15  # Above limit of 10
         }
-        response = client.post("/align", json=invalid_request)
+        response = post_json(validation_client, "/align", invalid_request)
         assert response.status_code == 422
         
         # Test skip penalty out of range
@@ -208,19 +305,22 @@ class TestBasicAlignmentValidation:
             **basic_alignment_request,
             "skip": 0.5  # Should be negative
         }
-        response = client.post("/align", json=invalid_request)
+        response = post_json(validation_client, "/align", invalid_request)
         assert response.status_code == 422
 
 
+@pytest.mark.model
+@pytest.mark.usefixtures("_warm_up_model")
 class TestTEIAlignmentEndpoint:
     """Tests for the TEI XML document alignment endpoint."""
     
-    def test_tei_alignment_success(self, client, basic_tei_request):
+    @pytest.mark.asyncio
+    async def test_tei_alignment_success(self, async_client, basic_tei_request):
         """Test TEI alignment with valid documents."""
-        response = client.post("/align/tei", json=basic_tei_request)
+        response = await post_json(async_client, "/align/tei", basic_tei_request)
         assert response.status_code == 200
         
-        data = response.json()
+        data = get_json(response)
         assert "aligned_xml" in data
         assert "source_language" in data
         assert "target_language" in data
@@ -244,28 +344,26 @@ class TestTEIAlignmentEndpoint:
         assert 'type="translation"' in aligned_xml
         
         # Validate it's well-formed XML
-        from xml.etree import ElementTree as ET
-        root = ET.fromstring(aligned_xml)
+        root, tei_elements = _parse_tei(aligned_xml)
         assert root.tag.endswith('teiCorpus')
         
         # Should contain both original TEI documents
-        tei_elements = root.findall('.//{http://www.tei-c.org/ns/1.0}TEI')
         assert len(tei_elements) == 2  # Source and target documents
 
-    def test_tei_explicit_language_override(self, client, simple_italian_tei, simple_english_tei):
+    def test_tei_explicit_language_override(self, client, unknown_language_italian_tei, unknown_language_english_tei):
         """Test TEI alignment with explicit language parameters override TEI metadata."""
         # TEI with different language in metadata than what we specify
         request_data = {
-            "source_tei": simple_italian_tei.replace('ident="it"', 'ident="unknown"'),
-            "target_tei": simple_english_tei.replace('ident="en"', 'ident="unknown"'),
-            "source_language": "it",
-            "target_language": "en"
+            "languageA": unknown_language_italian_tei,
+            "languageB": unknown_language_english_tei,
+            "languageA_name": "it",
+            "languageB_name": "en"
         }
         
-        response = client.post("/align/tei", json=request_data)
+        response = post_json(client, "/align/tei", request_data)
         assert response.status_code == 200
         
-        data = response.json()
+        data = get_json(response)
         # Should use our explicit languages, not "unknown" from metadata
         assert data["source_language"] == "it"
         assert data["target_language"] == "en"
@@ -279,79 +377,43 @@ class TestTEIAlignmentEndpoint:
             "win": 3
         }
         
-        response = client.post("/align/tei", json=custom_request)
+        response = post_json(client, "/align/tei", custom_request)
         assert response.status_code == 200
     
     def test_tei_sentence_level_seg_tags(self, client):
         """Test that TEI alignment creates <seg> tags for sentence-level alignments within paragraphs."""
-        # Create test documents with multi-sentence paragraphs that should generate sentence alignments
-        italian_tei_multi = '''<?xml version="1.0" encoding="UTF-8"?>
-        <TEI xmlns="http://www.tei-c.org/ns/1.0">
-            <teiHeader>
-                <fileDesc>
-                    <titleStmt><title>Test Document</title></titleStmt>
-                </fileDesc>
-                <profileDesc>
-                    <langUsage><language ident="it">Italian</language></langUsage>
-                </profileDesc>
-            </teiHeader>
-            <text>
-                <body>
-                    <p>Prima frase del test. Seconda frase molto diversa. Terza frase finale.</p>
-                </body>
-            </text>
-        </TEI>'''
-        
-        english_tei_multi = '''<?xml version="1.0" encoding="UTF-8"?>
-        <TEI xmlns="http://www.tei-c.org/ns/1.0">
-            <teiHeader>
-                <fileDesc>
-                    <titleStmt><title>Test Document</title></titleStmt>
-                </fileDesc>
-                <profileDesc>
-                    <langUsage><language ident="en">English</language></langUsage>
-                </profileDesc>
-            </teiHeader>
-            <text>
-                <body>
-                    <p>First test sentence. Completely different second sentence. Final third sentence.</p>
-                </body>
-            </text>
-        </TEI>'''
-        
+        # Multi-sentence paragraphs that should generate sentence alignments
         request_data = {
-            "source_tei": italian_tei_multi,
-            "target_tei": english_tei_multi,
-            "source_language": "it",
-            "target_language": "en"
+            "languageA": _ITALIAN_TEI_MULTI,
+            "languageB": _ENGLISH_TEI_MULTI,
+            "languageA_name": "it",
+            "languageB_name": "en"
         }
         
-        response = client.post("/align/tei", json=request_data)
+        response = post_json(client, "/align/tei", request_data)
         assert response.status_code == 200
         
-        data = response.json()
+        data = get_json(response)
         aligned_xml = data["aligned_xml"]
         
         # Parse the result to check for seg tags
-        from xml.etree import ElementTree as ET
-        root = ET.fromstring(aligned_xml)
+        _, tei_documents = _parse_tei(aligned_xml)
         
         # Check for sentence-level seg tags within paragraphs
         # Note: Actual seg creation depends on bertalign's sentence splitting behavior
         # This test validates the API can handle multi-sentence scenarios
-        tei_documents = root.findall('.//{http://www.tei-c.org/ns/1.0}TEI')
         assert len(tei_documents) == 2
+        paragraphs_per_tei = [_P_XPATH(tei_doc) for tei_doc in tei_documents]
         
         # Each document should have paragraphs, either with xml:id (paragraph-level)
         # or containing seg elements (sentence-level)
-        for tei_doc in tei_documents:
-            paragraphs = tei_doc.findall('.//{http://www.tei-c.org/ns/1.0}p')
+        for paragraphs in paragraphs_per_tei:
             assert len(paragraphs) >= 1
             
             for p in paragraphs:
                 # Either paragraph has xml:id or contains seg elements with xml:id
-                has_paragraph_id = p.get('{http://www.w3.org/XML/1998/namespace}id') is not None
-                seg_elements = p.findall('.//{http://www.tei-c.org/ns/1.0}seg')
+                has_paragraph_id = bool(_XMLID_XPATH(p))
+                seg_elements = _SEG_XPATH(p)
                 has_seg_elements = len(seg_elements) > 0
                 
                 # Should have either paragraph-level or sentence-level alignment marking
@@ -361,59 +423,78 @@ class TestTEIAlignmentEndpoint:
                     # If using seg elements, they should have xml:id attributes
                     if has_seg_elements:
                         for seg in seg_elements:
-                            seg_id = seg.get('{http://www.w3.org/XML/1998/namespace}id')
+                            seg_id = _XMLID_XPATH(seg)
                             if seg_id:  # Only check aligned segments
                                 assert seg_id is not None
                                 assert len(seg_id) > 0
 
 
+@pytest.mark.fast
 class TestTEIAlignmentValidation:
     """Tests for input validation on TEI alignment endpoint."""
     
-    def test_invalid_tei_xml(self, client):
+    def test_invalid_tei_xml(self, validation_client):
         """Test TEI alignment endpoint with invalid XML."""
         request_data = {
-            "source_tei": "<invalid>xml",
-            "target_tei": "also invalid",
-            "source_language": "en",
-            "target_language": "fr"
+            "languageA": "<invalid>xml",
+            "languageB": "also invalid",
+            "languageA_name": "en",
+            "languageB_name": "fr"
+        }
+        
+        response = post_json(validation_client, "/align/tei", request_data)
+        assert response.status_code == 400
+
+    def test_tei_batch_invalid_xml(self, validation_client, simple_italian_tei, simple_english_tei):
+        """Test one malformed pair fails the whole TEI batch before alignment."""
+        valid = {
+            "languageA": simple_italian_tei,
+            "languageB": simple_english_tei,
+            "languageA_name": "it",
+            "languageB_name": "en"
         }
+        invalid = {**valid, "languageB": "<invalid>xml"}
         
-        response = client.post("/align/tei", json=request_data)
+        response = post_json(validation_client, "/align/tei/batch", [valid, invalid])
         assert response.status_code == 400
 
-    def test_missing_tei_language_parameters(self, client, simple_italian_tei, simple_english_tei):
+    def test_tei_batch_size_limits(self, validation_client):
+        """Test the TEI batch endpoint rejects an empty list."""
+        response = post_json(validation_client, "/align/tei/batch", [])
+        assert response.status_code == 422
+
+    def test_missing_tei_language_parameters(self, validation_client, simple_italian_tei, simple_english_tei):
         """Test TEI alignment endpoint with missing language parameters."""
         request_data = {
-            "source_tei": simple_italian_tei,
-            "target_tei": simple_english_tei
+            "languageA": simple_italian_tei,
+            "languageB": simple_english_tei
         }
         
-        response = client.post("/align/tei", json=request_data)
+        response = post_json(validation_client, "/align/tei", request_data)
         assert response.status_code == 422
 
-    def test_invalid_tei_language_codes(self, client, simple_italian_tei, simple_english_tei):
+    def test_invalid_tei_language_codes(self, validation_client, simple_italian_tei, simple_english_tei):
         """Test TEI alignment with invalid language codes."""
         # Test invalid source language
         request_data = {
-            "source_tei": simple_italian_tei,
-            "target_tei": simple_english_tei,
-            "source_language": "invalid",
-            "target_language": "en"
+            "languageA": simple_italian_tei,
+            "languageB": simple_english_tei,
+            "languageA_name": "invalid",
+            "languageB_name": "en"
         }
         
-        response = client.post("/align/tei", json=request_data)
+        response = post_json(validation_client, "/align/tei", request_data)
         assert response.status_code == 422
         
         # Test invalid target language
         request_data = {
-            "source_tei": simple_italian_tei,
-            "target_tei": simple_english_tei,
-            "source_language": "it",
-            "target_language": "invalid"
+            "languageA": simple_italian_tei,
+            "languageB": simple_english_tei,
+            "languageA_name": "it",
+            "languageB_name": "invalid"
         }
         
-        response = client.post("/align/tei", json=request_data)
+        response = post_json(validation_client, "/align/tei", request_data)
         assert response.status_code == 422
 
 
@@ -421,64 +502,50 @@ class TestAPIDocumentation:
     """Tests for API documentation endpoints."""
     
     def test_openapi_docs_accessible(self, client):
-        """Test that OpenAPI documentation is accessible."""
-        response = client.get("/docs")
-        assert response.status_code == 200
-        
-        response = client.get("/redoc")
-        assert response.status_code == 200
+        """Test that OpenAPI documentation is configured and the schema route is wired."""
+        # The Swagger UI and ReDoc pages are static; checking the app config is enough
+        assert app.docs_url == "/docs"
+        assert app.redoc_url == "/redoc"
         
+        # One round-trip to confirm the schema route is served
         response = client.get("/openapi.json")
         assert response.status_code == 200
         
-        data = response.json()
+        data = app.openapi()
         assert "openapi" in data
         assert "paths" in data
         assert "/align" in data["paths"]
         assert "/align/tei" in data["paths"]
+        assert "/align/batch" in data["paths"]
+        assert "/align/tei/batch" in data["paths"]
 
 
+@pytest.mark.model
+@pytest.mark.usefixtures("_warm_up_model")
 class TestEdgeCases:
     """Tests for edge cases and boundary conditions."""
     
-    def test_single_sentence_alignment(self, client):
-        """Test alignment with single sentences."""
-        request = {
-            "source_text": "Hello world.",
-            "target_text": "Bonjour le monde.",
-            "source_language": "en",
-            "target_language": "fr"
-        }
-        response = client.post("/align", json=request)
-        assert response.status_code == 200
-        
-        data = response.json()
-        assert data["total_source_sentences"] == 1
-        assert data["total_target_sentences"] == 1
-
-    def test_very_short_text(self, client):
-        """Test alignment with very short text."""
+    @pytest.mark.parametrize(
+        "source_text,target_text,expected_source_n,expected_target_n",
+        [
+            pytest.param("Hello world.", "Bonjour le monde.", 1, 1, id="single-sentence"),
+            pytest.param("Hi.", "Bonjour.", 1, 1, id="very-short-text"),
+            pytest.param("Hello. World. Test.", "Bonjour le monde.", 3, 1, id="mismatched-sentence-counts"),
+        ],
+    )
+    def test_alignment_cases(self, client, source_text, target_text, expected_source_n, expected_target_n):
+        """Test alignment of boundary-sized inputs, including mismatched sentence counts."""
         request = {
-            "source_text": "Hi.",
-            "target_text": "Bonjour.",
+            "source_text": source_text,
+            "target_text": target_text,
             "source_language": "en",
             "target_language": "fr"
         }
-        response = client.post("/align", json=request)
-        assert response.status_code == 200
-
-    def test_mismatched_sentence_counts(self, client):
-        """Test alignment with mismatched sentence counts."""
-        request = {
-            "source_text": "Hello. World. Test.",
-            "target_text": "Bonjour le monde.",
-            "source_language": "en",
-            "target_language": "fr"
-        }
-        response = client.post("/align", json=request)
+        response = post_json(client, "/align", request)
         assert response.status_code == 200
         
-        data = response.json()
-        # Should handle mismatched counts gracefully
-        assert data["total_source_sentences"] != data["total_target_sentences"]
-        assert len(data["alignments"]) > 0
\ No newline at end of file
+        data = get_json(response)
+        assert data["total_source_sentences"] == expected_source_n
+        assert data["total_target_sentences"] == expected_target_n
+        # Mismatched counts should still be handled gracefully
+        assert len(data["alignments"]) > 0
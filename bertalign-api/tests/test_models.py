@@ -7,7 +7,25 @@ and TEIAlignmentRequest models, ensuring proper validation of inputs.
 
 import pytest
 from pydantic import ValidationError
-from app.models import AlignmentRequest, TEIAlignmentRequest
+from app.models import MAX_TEI_LEN, AlignmentRequest, TEIAlignmentRequest
+
+
+# Baseline valid AlignmentRequest arguments; invalid cases override single fields
+_VALID_ALIGNMENT_KWARGS = {
+    "source_text": "Hello world.",
+    "target_text": "Bonjour le monde.",
+    "source_language": "en",
+    "target_language": "fr",
+}
+
+# Smallest TEI document that exceeds the request size limit, built once at import
+_OVERSIZE_PREFIX = '<?xml version="1.0"?><TEI xmlns="http://www.tei-c.org/ns/1.0"><text><body><p>'
+_OVERSIZE_SUFFIX = '</p></body></text></TEI>'
+_OVERSIZE_TEI = (
+    _OVERSIZE_PREFIX
+    + "x" * (MAX_TEI_LEN + 1 - len(_OVERSIZE_PREFIX) - len(_OVERSIZE_SUFFIX))
+    + _OVERSIZE_SUFFIX
+)
 
 
 def test_alignment_request_valid():
@@ -39,75 +57,20 @@ def test_alignment_request_custom_params():
     assert request.win == 10
 
 
-def test_empty_text_validation():
-    """Test validation for empty texts."""
-    with pytest.raises(ValidationError) as exc_info:
-        AlignmentRequest(
-            source_text="",
-            target_text="Bonjour le monde.",
-            source_language="en",
-            target_language="fr"
-        )
-    assert "String should have at least 1 character" in str(exc_info.value)
-
-
-def test_whitespace_only_text_validation():
-    """Test validation for whitespace-only texts."""
+@pytest.mark.parametrize("overrides,expected_message", [
+    pytest.param({"source_text": ""}, "String should have at least 1 character", id="empty-text"),
+    pytest.param({"source_text": "   \n\t  "}, "Text cannot be empty", id="whitespace-only-text"),
+    pytest.param({"source_language": "eng"}, "String should match pattern", id="invalid-language-code"),
+    pytest.param({"source_language": "xx"}, "is not supported", id="unsupported-language"),
+    pytest.param({"max_align": 15}, None, id="max-align-too-high"),  # max is 10
+    pytest.param({"skip": 0.5}, None, id="skip-not-negative"),
+])
+def test_alignment_request_invalid(overrides, expected_message):
+    """Test that invalid texts, language codes and parameter ranges are rejected."""
     with pytest.raises(ValidationError) as exc_info:
-        AlignmentRequest(
-            source_text="   \n\t  ",
-            target_text="Bonjour le monde.",
-            source_language="en",
-            target_language="fr"
-        )
-    assert "Text cannot be empty" in str(exc_info.value)
-
-
-def test_invalid_language_code():
-    """Test validation for invalid language codes."""
-    with pytest.raises(ValidationError) as exc_info:
-        AlignmentRequest(
-            source_text="Hello world.",
-            target_text="Bonjour le monde.",
-            source_language="eng",  # Invalid - should be 2 chars
-            target_language="fr"
-        )
-    assert "String should match pattern" in str(exc_info.value)
-
-
-def test_unsupported_language():
-    """Test validation for unsupported languages."""
-    with pytest.raises(ValidationError) as exc_info:
-        AlignmentRequest(
-            source_text="Hello world.",
-            target_text="Bonjour le monde.",
-            source_language="xx",  # Unsupported language
-            target_language="fr"
-        )
-    assert "is not supported" in str(exc_info.value)
-
-
-def test_parameter_ranges():
-    """Test parameter validation ranges."""
-    # Test max_align too high
-    with pytest.raises(ValidationError):
-        AlignmentRequest(
-            source_text="Hello world.",
-            target_text="Bonjour le monde.",
-            source_language="en",
-            target_language="fr",
-            max_align=15  # Too high, max is 10
-        )
-    
-    # Test skip penalty out of range
-    with pytest.raises(ValidationError):
-        AlignmentRequest(
-            source_text="Hello world.",
-            target_text="Bonjour le monde.",
-            source_language="en",
-            target_language="fr",
-            skip=0.5  # Should be negative
-        )
+        AlignmentRequest(**{**_VALID_ALIGNMENT_KWARGS, **overrides})
+    if expected_message is not None:
+        assert expected_message in str(exc_info.value)
 
 
 class TestTEIAlignmentRequest:
@@ -189,16 +152,15 @@ class TestTEIAlignmentRequest:
     
     def test_tei_size_limits(self):
         """Test TEI request size limits."""
-        # Create a large XML string (over 1MB)
-        large_xml = '''<?xml version="1.0"?><TEI xmlns="http://www.tei-c.org/ns/1.0"><text><body>''' + \
-                   '''<p>''' + "x" * 1000000 + '''</p>''' + \
-                   '''</body></text></TEI>'''
-        
         with pytest.raises(ValidationError) as exc_info:
             TEIAlignmentRequest(
-                source_tei=large_xml,
-                target_tei="<TEI></TEI>",
-                source_language="en",
-                target_language="fr"
+                languageA=_OVERSIZE_TEI,
+                languageB="<TEI></TEI>",
+                languageA_name="en",
+                languageB_name="fr"
             )
-        assert "String should have at most" in str(exc_info.value)
\ No newline at end of file
+        errors = exc_info.value.errors()
+        assert len(errors) == 1
+        assert errors[0]["loc"] == ("languageA",)
+        assert errors[0]["type"] == "string_too_long"
+        assert errors[0]["ctx"]["max_length"] == MAX_TEI_LEN
\ No newline at end of file
@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import patch
 from app.services.bertalign_service import BertalignService
 from app.models import AlignmentRequest
 
@@ -80,29 +80,26 @@ def test_bertalign_service_error_handling():
         )
 
 
-def test_bertalign_service_different_text_sizes():
+@pytest.mark.parametrize("source_text,target_text,min_sentences", [
+    pytest.param("Hi.", "Salut.", 1, id="small"),
+    pytest.param(
+        "Hello world. This is a test. How are you today?",
+        "Bonjour le monde. Ceci est un test. Comment allez-vous aujourd'hui?",
+        3,
+        id="medium",
+    ),
+])
+def test_bertalign_service_different_text_sizes(bertalign_service, source_text, target_text, min_sentences):
     """Test service with different text sizes."""
-    # Small text
-    small_request = AlignmentRequest(
-        source_text="Hi.",
-        target_text="Salut.",
-        source_language="en",
-        target_language="fr"
-    )
-    response = BertalignService.align_texts(small_request)
-    assert response.total_source_sentences >= 1
-    assert response.total_target_sentences >= 1
-    
-    # Medium text
-    medium_request = AlignmentRequest(
-        source_text="Hello world. This is a test. How are you today?",
-        target_text="Bonjour le monde. Ceci est un test. Comment allez-vous aujourd'hui?",
+    request = AlignmentRequest(
+        source_text=source_text,
+        target_text=target_text,
         source_language="en",
         target_language="fr"
     )
-    response = BertalignService.align_texts(medium_request)
-    assert response.total_source_sentences >= 3
-    assert response.total_target_sentences >= 3
+    response = bertalign_service.align_texts(request)
+    assert response.total_source_sentences >= min_sentences
+    assert response.total_target_sentences >= min_sentences
 
 
 def test_bertalign_service_pre_split():
@@ -120,30 +117,22 @@ def test_bertalign_service_pre_split():
     assert response.total_target_sentences == 2
 
 
-@patch('app.services.bertalign_service.Bertalign')
-def test_bertalign_service_initialization_error(mock_bertalign):
-    """Test service behavior when Bertalign initialization fails."""
+def _fail_on_init(mock_bertalign):
     mock_bertalign.side_effect = Exception("Model loading failed")
-    
-    request = AlignmentRequest(
-        source_text="Hello world.",
-        target_text="Bonjour le monde.",
-        source_language="en",
-        target_language="fr"
-    )
-    
-    with pytest.raises(RuntimeError) as exc_info:
-        BertalignService.align_texts(request)
-    
-    assert "Failed to initialize Bertalign" in str(exc_info.value)
 
 
+def _fail_on_align(mock_bertalign):
+    mock_bertalign.return_value.align_sents.side_effect = Exception("Alignment computation failed")
+
+
+@pytest.mark.parametrize("break_bertalign,expected_message", [
+    pytest.param(_fail_on_init, "Failed to initialize Bertalign", id="initialization"),
+    pytest.param(_fail_on_align, "Alignment failed", id="alignment"),
+])
 @patch('app.services.bertalign_service.Bertalign')
-def test_bertalign_service_alignment_error(mock_bertalign):
-    """Test service behavior when alignment fails."""
-    mock_instance = Mock()
-    mock_instance.align_sents.side_effect = Exception("Alignment computation failed")
-    mock_bertalign.return_value = mock_instance
+def test_bertalign_service_errors(mock_bertalign, break_bertalign, expected_message):
+    """Test service behavior when Bertalign initialization or alignment fails."""
+    break_bertalign(mock_bertalign)
     
     request = AlignmentRequest(
         source_text="Hello world.",
@@ -155,4 +144,4 @@ def test_bertalign_service_alignment_error(mock_bertalign):
     with pytest.raises(RuntimeError) as exc_info:
         BertalignService.align_texts(request)
     
-    assert "Alignment failed" in str(exc_info.value)
\ No newline at end of file
+    assert expected_message in str(exc_info.value)
@@ -1,38 +1,54 @@
 """
 Tests for TEI service functionality.
 """
+import re
+from itertools import chain
+
 import pytest
-from unittest.mock import Mock, patch
-from xml.etree import ElementTree as ET
+from lxml import etree as ET
 
 from app.services.tei_service import TEIService, TEIDocument, TEIElement
-from app.services.bertalign_service import BertalignService
 from app.models import AlignmentPair, AlignmentResponse, AlignmentRequest
 
 
-@pytest.fixture
-def mock_bertalign_service():
-    """Mock bertalign service for testing."""
-    service = Mock(spec=BertalignService)
-    service.max_align = 5
-    service.top_k = 3
-    service.win = 5
-    service.skip = -0.1
-    service.margin = True
-    service.len_penalty = True
-    return service
+# Bertalign is mocked throughout, so the whole module belongs to the fast lane
+pytestmark = pytest.mark.fast
 
+NSMAP = {
+    "tei": "http://www.tei-c.org/ns/1.0",
+    "xml": "http://www.w3.org/XML/1998/namespace",
+}
+XML_ID = f"{{{NSMAP['xml']}}}id"
+_SEG_TAG = f"{{{NSMAP['tei']}}}seg"
+_TEI_CORPUS_TAG = f"{{{NSMAP['tei']}}}teiCorpus"
 
-@pytest.fixture
-def tei_service(mock_bertalign_service):
-    """TEI service with mocked bertalign service."""
-    return TEIService(mock_bertalign_service)
+# The aligned corpus holds both documents, whose own xml:ids may repeat across them
+_PARSER = ET.XMLParser(collect_ids=False)
 
+# XPath expressions compiled once and evaluated relative to the node passed in
+_STANDOFF = ET.XPath('.//tei:standOff', namespaces=NSMAP)
+_LINKS = ET.XPath('.//tei:link', namespaces=NSMAP)
+_TEIS = ET.XPath('.//tei:TEI', namespaces=NSMAP)
+_PARAS = ET.XPath('.//tei:p', namespaces=NSMAP)
+_HEADS = ET.XPath('.//tei:head', namespaces=NSMAP)
+_BODY = ET.XPath('.//tei:body', namespaces=NSMAP)
+_LINK_COUNT = ET.XPath('count(.//tei:link)', namespaces=NSMAP)
+_TEI_COUNT = ET.XPath('count(.//tei:TEI)', namespaces=NSMAP)
+_SEG_COUNT = ET.XPath('count(.//tei:seg)', namespaces=NSMAP)
+_XML_IDS = ET.XPath('.//@xml:id', namespaces=NSMAP)
+_SEG_IDS = ET.XPath('.//tei:seg/@xml:id', namespaces=NSMAP)
 
-@pytest.fixture
-def sample_italian_tei():
-    """Sample Italian TEI document."""
-    return '''<?xml version="1.0" encoding="UTF-8"?>
+# Opening tag of a standOff <link>, for checks that do not need a parsed tree
+_LINK_TAG_RE = re.compile(r'<link\s[^>]*>')
+
+
+def _first(xpath, node):
+    """Return the first match of a compiled XPath, or None."""
+    matches = xpath(node)
+    return matches[0] if matches else None
+
+
+_SAMPLE_ITALIAN_TEI = '''<?xml version="1.0" encoding="UTF-8"?>
 <TEI xmlns="http://www.tei-c.org/ns/1.0">
     <teiHeader>
         <fileDesc>
@@ -63,10 +79,7 @@ def sample_italian_tei():
 </TEI>'''
 
 
-@pytest.fixture
-def sample_english_tei():
-    """Sample English TEI document."""
-    return '''<?xml version="1.0" encoding="UTF-8"?>
+_SAMPLE_ENGLISH_TEI = '''<?xml version="1.0" encoding="UTF-8"?>
 <TEI xmlns="http://www.tei-c.org/ns/1.0">
     <teiHeader>
         <fileDesc>
@@ -96,31 +109,251 @@ def sample_english_tei():
     </text>
 </TEI>'''
 
+# One paragraph of three sentences per language, for the sentence-level seg tests
+_THREE_SENTENCE_ITALIAN_TEI = '''<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0">
+    <teiHeader>
+        <fileDesc>
+            <titleStmt><title>Test Document</title></titleStmt>
+        </fileDesc>
+    </teiHeader>
+    <text>
+        <body>
+            <p>Prima frase italiana. Seconda frase italiana. Terza frase italiana.</p>
+        </body>
+    </text>
+</TEI>'''
+
+_THREE_SENTENCE_ENGLISH_TEI = '''<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0">
+    <teiHeader>
+        <fileDesc>
+            <titleStmt><title>Test Document</title></titleStmt>
+        </fileDesc>
+    </teiHeader>
+    <text>
+        <body>
+            <p>First English sentence. Second English sentence. Third English sentence.</p>
+        </body>
+    </text>
+</TEI>'''
+
+# The sentences of those paragraphs, in document order
+_THREE_SENTENCE_ITALIAN_SENTENCES = ("Prima frase italiana.", "Seconda frase italiana.", "Terza frase italiana.")
+_THREE_SENTENCE_ENGLISH_SENTENCES = ("First English sentence.", "Second English sentence.", "Third English sentence.")
+_ITALIAN_PHRASES_RE = re.compile(r'Prima frase italiana|Seconda frase italiana|Terza frase italiana')
+_ENGLISH_PHRASES_RE = re.compile(r'First English sentence|Second English sentence|Third English sentence')
+
+# Three sentences per side, aligned 2-to-1 and 1-to-2 in TestManyToManyAlignment
+_MANY_TO_MANY_SOURCE_TEI = """<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0">
+    <teiHeader>
+        <fileDesc>
+            <titleStmt><title>Test</title></titleStmt>
+        </fileDesc>
+    </teiHeader>
+    <text>
+        <body>
+            <p>Prima frase. Seconda frase. Terza frase.</p>
+        </body>
+    </text>
+</TEI>"""
+
+_MANY_TO_MANY_TARGET_TEI = """<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0">
+    <teiHeader>
+        <fileDesc>
+            <titleStmt><title>Test</title></titleStmt>
+        </fileDesc>
+    </teiHeader>
+    <text>
+        <body>
+            <p>First sentence. Second sentence. Third sentence.</p>
+        </body>
+    </text>
+</TEI>"""
+
+
+@pytest.fixture(scope="session")
+def mock_bertalign_service(bertalign_stub_factory):
+    """Stub bertalign service for testing, shared across the session."""
+    return bertalign_stub_factory()
+
+
+@pytest.fixture(autouse=True)
+def _reset_mock(mock_bertalign_service):
+    """Give each test a clean stub: no recorded calls, return values or side effects."""
+    mock_bertalign_service.reset()
+
+
+@pytest.fixture(autouse=True)
+def deterministic_ids(monkeypatch):
+    """Use a fixed xml:id prefix in the TEI service so output is reproducible."""
+    monkeypatch.setattr("app.services.tei_service.secrets.token_hex", lambda nbytes: "0" * (2 * nbytes))
+
+
+@pytest.fixture(scope="session")
+def tei_service(mock_bertalign_service):
+    """TEI service with mocked bertalign service."""
+    return TEIService(mock_bertalign_service)
+
+
+@pytest.fixture(scope="session")
+def sample_italian_tei():
+    """Sample Italian TEI document."""
+    return _SAMPLE_ITALIAN_TEI
+
+
+@pytest.fixture(scope="session")
+def sample_english_tei():
+    """Sample English TEI document."""
+    return _SAMPLE_ENGLISH_TEI
+
+
+@pytest.fixture(scope="session")
+def parsed_italian_doc(tei_service, sample_italian_tei):
+    """Sample Italian TEI document, parsed once per session.
+
+    Later parses of the same XML are served from the service's parse cache, so
+    the documents are shared and treated as read-only.
+    """
+    return tei_service.parse_tei_file(sample_italian_tei)
+
+
+@pytest.fixture(scope="session")
+def parsed_english_doc(tei_service, sample_english_tei):
+    """Sample English TEI document, parsed once per session."""
+    return tei_service.parse_tei_file(sample_english_tei)
+
+
+@pytest.fixture(scope="session")
+def three_sentence_docs(tei_service):
+    """Italian and English three-sentence documents, parsed once per session."""
+    return (tei_service.parse_tei_file(_THREE_SENTENCE_ITALIAN_TEI),
+            tei_service.parse_tei_file(_THREE_SENTENCE_ENGLISH_TEI))
+
+
+@pytest.fixture(scope="session")
+def canonical_alignment_response():
+    """Alignment result pairing the first sentence of each sample document."""
+    return AlignmentResponse(
+        alignments=[
+            AlignmentPair(
+                source_sentences=["Come introduzione un breve chiarimento concettuale."],
+                target_sentences=["By way of introduction, a brief clarification of concepts."],
+                alignment_score=0.95,
+                source_indices=[0],
+                target_indices=[0]
+            )
+        ],
+        source_language="it",
+        target_language="en",
+        processing_time=0.5,
+        total_source_sentences=1,
+        total_target_sentences=1,
+        parameters=AlignmentRequest(
+            source_text="test",
+            target_text="test",
+            source_language="it",
+            target_language="en"
+        )
+    )
+
+
+@pytest.fixture(scope="session")
+def empty_alignment_response():
+    """Alignment result without any aligned pairs."""
+    return AlignmentResponse(
+        alignments=[],
+        source_language="it",
+        target_language="en",
+        processing_time=0.5,
+        total_source_sentences=0,
+        total_target_sentences=0,
+        parameters=AlignmentRequest(
+            source_text="test",
+            target_text="test",
+            source_language="it",
+            target_language="en"
+        )
+    )
+
 
 class TestTEIService:
     """Test TEI service functionality."""
     
-    def test_parse_italian_tei(self, tei_service, sample_italian_tei):
-        """Test parsing Italian TEI document."""
-        doc = tei_service.parse_tei_file(sample_italian_tei)
+    @pytest.mark.parametrize("tei_fixture,language,title,texts", [
+        ("sample_italian_tei", "it", "Contributi alla teoria figurativa della forma",
+         ["Come introduzione un breve chiarimento concettuale.",
+          "In primo luogo ciò che è contenuto nel concetto di analisi."]),
+        ("sample_english_tei", "en", "Contributions to the Theory of Pictorial Form",
+         ["By way of introduction, a brief clarification of concepts.",
+          "First, what the concept of analysis encompasses."]),
+    ], ids=["italian", "english"])
+    def test_parse_tei(self, request, tei_service, tei_fixture, language, title, texts):
+        """Test parsing the sample Italian and English TEI documents."""
+        doc = tei_service.parse_tei_file(request.getfixturevalue(tei_fixture))
         
         assert isinstance(doc, TEIDocument)
-        assert doc.language == "it"
-        assert doc.title == "Contributi alla teoria figurativa della forma"
-        assert len(doc.text_elements) == 2
-        assert doc.text_elements[0].text == "Come introduzione un breve chiarimento concettuale."
-        assert doc.text_elements[1].text == "In primo luogo ciò che è contenuto nel concetto di analisi."
+        assert doc.language == language
+        assert doc.title == title
+        assert [elem.text for elem in doc.text_elements] == texts
+    
+    def test_parse_tei_bytes(self, tei_service, sample_italian_tei):
+        """Test parsing TEI supplied as encoded bytes gives the same document."""
+        from_bytes = tei_service.parse_tei_file(sample_italian_tei.encode('utf-8'))
+        from_str = tei_service.parse_tei_file(sample_italian_tei)
+        
+        assert from_bytes.language == from_str.language
+        assert from_bytes.title == from_str.title
+        assert [e.text for e in from_bytes.text_elements] == [e.text for e in from_str.text_elements]
     
-    def test_parse_english_tei(self, tei_service, sample_english_tei):
-        """Test parsing English TEI document."""
-        doc = tei_service.parse_tei_file(sample_english_tei)
+    def test_parse_accepts_repeated_and_non_ncname_ids(self, tei_service):
+        """Test xml:ids are not validated, so imperfect real-world ids still parse."""
+        xml = ('<TEI xmlns="http://www.tei-c.org/ns/1.0"><text><body>'
+               '<p xml:id="1.1">Uno.</p><p xml:id="p">Due.</p><p xml:id="p">Tre.</p>'
+               '</body></text></TEI>')
         
-        assert isinstance(doc, TEIDocument)
-        assert doc.language == "en"
-        assert doc.title == "Contributions to the Theory of Pictorial Form"
-        assert len(doc.text_elements) == 2
-        assert doc.text_elements[0].text == "By way of introduction, a brief clarification of concepts."
-        assert doc.text_elements[1].text == "First, what the concept of analysis encompasses."
+        doc = tei_service.parse_tei_file(xml)
+        
+        assert [e.text for e in doc.text_elements] == ['Uno.', 'Due.', 'Tre.']
+    
+    def test_parse_str_ignores_declared_encoding(self, tei_service):
+        """Test text input is read as decoded text even when it declares another encoding."""
+        latin1_xml = ('<?xml version="1.0" encoding="ISO-8859-1"?>'
+                      '<TEI xmlns="http://www.tei-c.org/ns/1.0"><text><body>'
+                      '<p>caffè più</p></body></text></TEI>')
+        
+        from_str = tei_service.parse_tei_file(latin1_xml)
+        from_bytes = tei_service.parse_tei_file(latin1_xml.encode('iso-8859-1'))
+        
+        assert [e.text for e in from_str.text_elements] == ['caffè più']
+        assert [e.text for e in from_bytes.text_elements] == ['caffè più']
+    
+    def test_parse_cache_reuses_documents(self, mock_bertalign_service, sample_italian_tei, sample_english_tei):
+        """Test repeated uploads of the same TEI are served from the parse cache."""
+        italian_size = len(sample_italian_tei.encode('utf-8'))
+        service = TEIService(mock_bertalign_service, parse_cache_max_bytes=italian_size)
+        
+        first = service.parse_tei_file(sample_italian_tei)
+        assert service.parse_tei_file(sample_italian_tei) is first
+        assert service._parse_cache_bytes == italian_size
+        
+        # A different document pushes the total over the limit and evicts the
+        # least recently used entry
+        service.parse_tei_file(sample_english_tei)
+        assert len(service._parse_cache) == 1
+        assert service._parse_cache_bytes <= italian_size
+        assert service.parse_tei_file(sample_italian_tei) is not first
+    
+    def test_parse_cache_skips_large_documents(self, mock_bertalign_service, sample_italian_tei):
+        """Test documents above the per-document limit are parsed but never cached."""
+        service = TEIService(mock_bertalign_service, parse_cache_max_document_bytes=16)
+        
+        first = service.parse_tei_file(sample_italian_tei)
+        assert service.parse_tei_file(sample_italian_tei) is not first
+        assert not service._parse_cache
+        assert service._parse_cache_bytes == 0
     
     def test_parse_invalid_xml(self, tei_service):
         """Test parsing invalid XML raises ValueError."""
@@ -129,6 +362,17 @@ class TestTEIService:
         with pytest.raises(ValueError, match="Invalid TEI XML"):
             tei_service.parse_tei_file(invalid_xml)
     
+    def test_parse_rejects_external_entities(self, tei_service):
+        """Test external entities are never loaded while internal ones still expand."""
+        internal = '''<!DOCTYPE TEI [<!ENTITY ed "edition">]>
+<TEI xmlns="http://www.tei-c.org/ns/1.0"><teiHeader/><text><body><p>First &ed;.</p></body></text></TEI>'''
+        external = '''<!DOCTYPE TEI [<!ENTITY xxe SYSTEM "file:///etc/passwd">]>
+<TEI xmlns="http://www.tei-c.org/ns/1.0"><teiHeader/><text><body><p>&xxe;</p></body></text></TEI>'''
+        
+        assert [e.text for e in tei_service.parse_tei_file(internal).text_elements] == ["First edition."]
+        with pytest.raises(ValueError, match="Invalid TEI XML"):
+            tei_service.parse_tei_file(external)
+    
     def test_extract_language_default(self, tei_service):
         """Test language extraction with default fallback."""
         xml_without_lang = '''<?xml version="1.0" encoding="UTF-8"?>
@@ -173,42 +417,29 @@ class TestTEIService:
         
         doc = tei_service.parse_tei_file(xml_empty_body)
         assert len(doc.text_elements) == 0
-    
-    @patch('app.services.tei_service.uuid.uuid4')
-    def test_align_tei_documents(self, mock_uuid, tei_service, sample_italian_tei, sample_english_tei):
+
+    def test_parse_large_tei(self, tei_service):
+        """Test parsing a large TEI document extracts every paragraph in order."""
+        body = "\n".join(f"<p>Paragraph number {i}.</p>" for i in range(10000))
+        large_xml = f'''<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0">
+    <teiHeader>
+        <fileDesc>
+            <titleStmt><title>Large</title></titleStmt>
+        </fileDesc>
+    </teiHeader>
+    <text><body>{body}</body></text>
+</TEI>'''
+
+        doc = tei_service.parse_tei_file(large_xml)
+
+        assert len(doc.text_elements) == 10000
+        assert doc.text_elements[0].text == "Paragraph number 0."
+        assert doc.text_elements[-1].text == "Paragraph number 9999."
+
+    def test_align_tei_documents(self, tei_service, sample_italian_tei, sample_english_tei, canonical_alignment_response):
         """Test TEI document alignment."""
-        # Mock UUID generation
-        mock_uuid.side_effect = [
-            Mock(return_value='uuid1'),
-            Mock(return_value='uuid2')
-        ]
-        mock_uuid.return_value.__str__ = lambda: 'test-uuid'
-        
-        # Mock alignment result
-        mock_alignment = AlignmentResponse(
-            alignments=[
-                AlignmentPair(
-                    source_sentences=["Come introduzione un breve chiarimento concettuale."],
-                    target_sentences=["By way of introduction, a brief clarification of concepts."],
-                    alignment_score=0.95,
-                    source_indices=[0],
-                    target_indices=[0]
-                )
-            ],
-            source_language="it",
-            target_language="en", 
-            processing_time=0.5,
-            total_source_sentences=1,
-            total_target_sentences=1,
-            parameters=AlignmentRequest(
-                source_text="test",
-                target_text="test",
-                source_language="it",
-                target_language="en"
-            )
-        )
-        
-        tei_service.bertalign_service.align_texts.return_value = mock_alignment
+        tei_service.bertalign_service.align_texts.return_value = canonical_alignment_response
         
         # Perform alignment
         result = tei_service.align_tei_documents(sample_italian_tei, sample_english_tei)
@@ -225,6 +456,52 @@ class TestTEIService:
         assert '<standOff>' in aligned_xml
         assert '<linkGrp type="translation">' in aligned_xml
         assert 'xml:id=' in aligned_xml
+        
+        # The tree is returned with its serialized form, so callers need not reparse
+        assert result['aligned_tree'].tag == _TEI_CORPUS_TAG
+        assert ET.tostring(result['aligned_tree'], encoding='unicode') in aligned_xml
+    
+    def test_align_tei_documents_batch(self, tei_service, sample_italian_tei, sample_english_tei,
+                                       canonical_alignment_response, empty_alignment_response):
+        """Test batch TEI alignment sends one batch and keeps pairs in order."""
+        service = tei_service.bertalign_service
+        service.align_texts_batch.return_value = [canonical_alignment_response, empty_alignment_response]
+        
+        results = tei_service.align_tei_documents_batch(
+            [(sample_italian_tei, sample_english_tei), (sample_english_tei, sample_italian_tei)],
+            [(None, None), ('fr', None)]
+        )
+        
+        service.align_texts_batch.assert_called_once()
+        service.align_texts.assert_not_called()
+        requests = service.align_texts_batch.call_args[0][0]
+        assert [(r.source_language, r.target_language) for r in requests] == [('it', 'en'), ('fr', 'it')]
+        
+        assert [r['alignment_count'] for r in results] == [1, 0]
+        assert [r['source_language'] for r in results] == ['it', 'fr']
+        
+        # Each pair produces the same corpus as aligning it on its own
+        service.align_texts.return_value = canonical_alignment_response
+        single = tei_service.align_tei_documents(sample_italian_tei, sample_english_tei)
+        assert results[0]['aligned_xml'] == single['aligned_xml']
+    
+    def test_align_tei_documents_batch_language_count(self, tei_service, sample_italian_tei, sample_english_tei):
+        """Test batch TEI alignment rejects a languages list that does not match the pairs."""
+        with pytest.raises(ValueError, match="one language pair per document pair"):
+            tei_service.align_tei_documents_batch(
+                [(sample_italian_tei, sample_english_tei), (sample_english_tei, sample_italian_tei)],
+                [('it', 'en')]
+            )
+        
+        tei_service.bertalign_service.align_texts_batch.assert_not_called()
+    
+    def test_get_element_path_uses_xml_id(self, tei_service):
+        """Test element paths identify elements by xml:id, then by type."""
+        with_id = ET.fromstring('<p xmlns="http://www.tei-c.org/ns/1.0" xml:id="p1" type="x"/>')
+        with_type = ET.fromstring('<div xmlns="http://www.tei-c.org/ns/1.0" type="chapter"/>')
+        
+        assert tei_service._get_element_path(with_id) == "p[@xml:id='p1']"
+        assert tei_service._get_element_path(with_type) == "div[@type='chapter']"
     
     def test_get_element_text_with_children(self, tei_service):
         """Test text extraction from element with children."""
@@ -239,12 +516,8 @@ class TestTEIService:
         assert "sentence content" in text
         assert "text after" in text
     
-    def test_generate_aligned_tei_structure(self, tei_service, sample_italian_tei, sample_english_tei):
+    def test_generate_aligned_tei_structure(self, tei_service, parsed_italian_doc, parsed_english_doc):
         """Test aligned TEI XML structure generation."""
-        # Parse documents
-        source_doc = tei_service.parse_tei_file(sample_italian_tei)
-        target_doc = tei_service.parse_tei_file(sample_english_tei)
-        
         # Create test alignment
         alignments = [
             AlignmentPair(
@@ -257,31 +530,24 @@ class TestTEIService:
         ]
         
         # Generate aligned XML
-        aligned_xml = tei_service._generate_aligned_tei(source_doc, target_doc, alignments, "it", "en")
-        
-        # Parse result to verify structure
-        root = ET.fromstring(aligned_xml)
+        root, aligned_xml = tei_service._generate_aligned_tei(parsed_italian_doc, parsed_english_doc, alignments, "it", "en")
         
         # Check root element is teiCorpus (per TEI P5 specification)
         assert root.tag.endswith('teiCorpus')
-        # Namespace is set in ElementTree, so check for the namespace in the tag
+        # Tags are in Clark notation, so check for the namespace in the tag
         assert 'tei-c.org' in root.tag
         # Check version attribute
         assert root.get('version') == '3.3.0'
         
-        # Check standOff structure
-        standoff = root.find('.//{http://www.tei-c.org/ns/1.0}standOff')
-        assert standoff is not None
-        
-        link_grp = standoff.find('.//{http://www.tei-c.org/ns/1.0}linkGrp')
-        assert link_grp is not None
-        assert link_grp.get('type') == 'translation'
+        # The standOff block is flat, so presence checks can scan the serialized text
+        assert '<standOff>' in aligned_xml
+        assert '<linkGrp type="translation">' in aligned_xml
         
         # Check link elements
-        links = link_grp.findall('.//{http://www.tei-c.org/ns/1.0}link')
+        links = _LINK_TAG_RE.findall(aligned_xml)
         assert len(links) == 1
-        assert links[0].get('type') == 'Linguistic'
-        assert links[0].get('target') is not None
+        assert 'type="Linguistic"' in links[0]
+        assert re.search(r'target="[^"]+"', links[0])
     
     def test_alignment_error_handling(self, tei_service, sample_italian_tei, sample_english_tei):
         """Test error handling during alignment."""
@@ -291,10 +557,8 @@ class TestTEIService:
         with pytest.raises(Exception, match="Alignment failed"):
             tei_service.align_tei_documents(sample_italian_tei, sample_english_tei)
     
-    def test_create_tei_with_ids(self, tei_service, sample_italian_tei):
+    def test_create_tei_with_ids(self, tei_service, parsed_italian_doc):
         """Test TEI document creation with XML IDs using <seg> tags."""
-        doc = tei_service.parse_tei_file(sample_italian_tei)
-        
         # Create alignment mapping
         alignment_map = {
             "Come introduzione un breve chiarimento concettuale.": "test-uuid-1",
@@ -302,18 +566,18 @@ class TestTEIService:
         }
         
         # Generate TEI with IDs
-        tei_with_ids = tei_service._create_tei_with_ids(doc, alignment_map, "it", is_source=True)
+        tei_with_ids = tei_service._create_tei_with_ids(parsed_italian_doc, alignment_map, "it", is_source=True)
         
         # Verify IDs were added (now as <seg> tags instead of paragraph xml:id)
-        paragraphs = tei_with_ids.findall('.//{http://www.tei-c.org/ns/1.0}p')
+        paragraphs = _PARAS(tei_with_ids)
         assert len(paragraphs) == 2
         
         # Check that paragraphs contain <seg> elements with xml:id (new behavior)
-        seg_elements = tei_with_ids.findall('.//{http://www.tei-c.org/ns/1.0}seg')
+        seg_elements = list(tei_with_ids.iter(_SEG_TAG))
         assert len(seg_elements) >= 1, "Should have at least one <seg> element"
         
         # Check that <seg> elements have xml:id attributes
-        has_seg_id = any(seg.get('{http://www.w3.org/XML/1998/namespace}id') for seg in seg_elements)
+        has_seg_id = any(seg.get(XML_ID) for seg in seg_elements)
         assert has_seg_id, "At least one <seg> element should have xml:id"
         
         # Check that the document structure is maintained
@@ -321,40 +585,12 @@ class TestTEIService:
         assert tei_with_ids.tag.endswith('TEI') or 'TEI' in tei_with_ids.tag
         
         # Check that the TEI structure is maintained
-        body = tei_with_ids.find('.//{http://www.tei-c.org/ns/1.0}body')
+        body = _first(_BODY, tei_with_ids)
         assert body is not None
     
-    @patch('app.services.tei_service.uuid.uuid4')
-    def test_align_tei_documents_with_explicit_languages(self, mock_uuid, tei_service, sample_italian_tei, sample_english_tei):
+    def test_align_tei_documents_with_explicit_languages(self, tei_service, sample_italian_tei, sample_english_tei, canonical_alignment_response):
         """Test TEI document alignment with explicit language parameters."""
-        # Mock UUID generation
-        mock_uuid.return_value.__str__ = lambda self: 'test-uuid'
-        
-        # Mock alignment result
-        mock_alignment = AlignmentResponse(
-            alignments=[
-                AlignmentPair(
-                    source_sentences=["Come introduzione un breve chiarimento concettuale."],
-                    target_sentences=["By way of introduction, a brief clarification of concepts."],
-                    alignment_score=0.95,
-                    source_indices=[0],
-                    target_indices=[0]
-                )
-            ],
-            source_language="it",
-            target_language="en", 
-            processing_time=0.5,
-            total_source_sentences=1,
-            total_target_sentences=1,
-            parameters=AlignmentRequest(
-                source_text="test",
-                target_text="test",
-                source_language="it",
-                target_language="en"
-            )
-        )
-        
-        tei_service.bertalign_service.align_texts.return_value = mock_alignment
+        tei_service.bertalign_service.align_texts.return_value = canonical_alignment_response
         
         # Perform alignment with explicit languages
         result = tei_service.align_tei_documents(
@@ -374,8 +610,7 @@ class TestTEIService:
         assert call_args.source_language == 'it'
         assert call_args.target_language == 'en'
     
-    @patch('app.services.tei_service.uuid.uuid4')
-    def test_align_tei_documents_override_metadata_languages(self, mock_uuid, tei_service):
+    def test_align_tei_documents_override_metadata_languages(self, tei_service, empty_alignment_response):
         """Test that explicit languages override TEI metadata languages."""
         # TEI documents with different languages in metadata
         italian_tei_unknown = '''<?xml version="1.0" encoding="UTF-8"?>
@@ -404,26 +639,7 @@ class TestTEIService:
     <text><body><div><p>Hello world.</p></div></body></text>
 </TEI>'''
         
-        # Mock UUID generation
-        mock_uuid.return_value.__str__ = lambda self: 'test-uuid'
-        
-        # Mock alignment result
-        mock_alignment = AlignmentResponse(
-            alignments=[],
-            source_language="it",
-            target_language="en", 
-            processing_time=0.5,
-            total_source_sentences=0,
-            total_target_sentences=0,
-            parameters=AlignmentRequest(
-                source_text="test",
-                target_text="test",
-                source_language="it",
-                target_language="en"
-            )
-        )
-        
-        tei_service.bertalign_service.align_texts.return_value = mock_alignment
+        tei_service.bertalign_service.align_texts.return_value = empty_alignment_response
         
         # Perform alignment with explicit languages that override "unknown" from metadata
         result = tei_service.align_tei_documents(
@@ -442,29 +658,9 @@ class TestTEIService:
         assert call_args.source_language == 'it'
         assert call_args.target_language == 'en'
     
-    @patch('app.services.tei_service.uuid.uuid4')
-    def test_align_tei_documents_fallback_to_metadata_languages(self, mock_uuid, tei_service, sample_italian_tei, sample_english_tei):
+    def test_align_tei_documents_fallback_to_metadata_languages(self, tei_service, sample_italian_tei, sample_english_tei, empty_alignment_response):
         """Test that service falls back to TEI metadata languages when explicit languages not provided."""
-        # Mock UUID generation
-        mock_uuid.return_value.__str__ = lambda self: 'test-uuid'
-        
-        # Mock alignment result
-        mock_alignment = AlignmentResponse(
-            alignments=[],
-            source_language="it",
-            target_language="en", 
-            processing_time=0.5,
-            total_source_sentences=0,
-            total_target_sentences=0,
-            parameters=AlignmentRequest(
-                source_text="test",
-                target_text="test",
-                source_language="it",
-                target_language="en"
-            )
-        )
-        
-        tei_service.bertalign_service.align_texts.return_value = mock_alignment
+        tei_service.bertalign_service.align_texts.return_value = empty_alignment_response
         
         # Perform alignment without explicit languages
         result = tei_service.align_tei_documents(sample_italian_tei, sample_english_tei)
@@ -478,40 +674,9 @@ class TestTEIService:
         assert call_args.source_language == 'it'
         assert call_args.target_language == 'en'
     
-    def test_sentence_level_seg_alignments(self, tei_service):
+    def test_sentence_level_seg_alignments(self, tei_service, three_sentence_docs):
         """Test sentence-level alignments within paragraphs using <seg> tags."""
-        # Create test documents with multi-sentence paragraphs
-        italian_tei = '''<?xml version="1.0" encoding="UTF-8"?>
-        <TEI xmlns="http://www.tei-c.org/ns/1.0">
-            <teiHeader>
-                <fileDesc>
-                    <titleStmt><title>Test Document</title></titleStmt>
-                </fileDesc>
-            </teiHeader>
-            <text>
-                <body>
-                    <p>Prima frase italiana. Seconda frase italiana. Terza frase italiana.</p>
-                </body>
-            </text>
-        </TEI>'''
-        
-        english_tei = '''<?xml version="1.0" encoding="UTF-8"?>
-        <TEI xmlns="http://www.tei-c.org/ns/1.0">
-            <teiHeader>
-                <fileDesc>
-                    <titleStmt><title>Test Document</title></titleStmt>
-                </fileDesc>
-            </teiHeader>
-            <text>
-                <body>
-                    <p>First English sentence. Second English sentence. Third English sentence.</p>
-                </body>
-            </text>
-        </TEI>'''
-        
-        # Parse documents
-        source_doc = tei_service.parse_tei_file(italian_tei)
-        target_doc = tei_service.parse_tei_file(english_tei)
+        source_doc, target_doc = three_sentence_docs
         
         # Create sentence-level alignments
         alignments = [
@@ -539,40 +704,36 @@ class TestTEIService:
         ]
         
         # Generate aligned XML with sentence-level segments
-        aligned_xml = tei_service._generate_aligned_tei(source_doc, target_doc, alignments, "it", "en")
-        
-        # Parse result to verify <seg> structure
-        root = ET.fromstring(aligned_xml)
+        root, aligned_xml = tei_service._generate_aligned_tei(source_doc, target_doc, alignments, "it", "en")
         
         # Check that we have a teiCorpus with the correct structure
         assert root.tag.endswith('teiCorpus')
         assert root.get('version') == '3.3.0'
         
         # Check standOff links - should have 3 sentence-level alignments
-        standoff = root.find('.//{http://www.tei-c.org/ns/1.0}standOff')
+        standoff = _first(_STANDOFF, root)
         assert standoff is not None
-        links = standoff.findall('.//{http://www.tei-c.org/ns/1.0}link')
-        assert len(links) == 3
+        assert _LINK_COUNT(standoff) == 3
         
         # Check that document structure is preserved and aligned properly
-        tei_documents = root.findall('.//{http://www.tei-c.org/ns/1.0}TEI')
+        tei_documents = _TEIS(root)
         assert len(tei_documents) == 2
         
         italian_tei_elem = tei_documents[0]
-        italian_p = italian_tei_elem.find('.//{http://www.tei-c.org/ns/1.0}p')
+        italian_p = _first(_PARAS, italian_tei_elem)
         assert italian_p is not None
         
         # Check English document structure  
         english_tei_elem = tei_documents[1]
-        english_p = english_tei_elem.find('.//{http://www.tei-c.org/ns/1.0}p')
+        english_p = _first(_PARAS, english_tei_elem)
         assert english_p is not None
         
         # Verify that elements have alignment identifiers
         # Current implementation may use paragraph-level IDs or seg tags depending on alignment granularity
-        italian_has_alignment_id = (italian_p.get('{http://www.w3.org/XML/1998/namespace}id') is not None or 
-                                   len(italian_p.findall('.//{http://www.tei-c.org/ns/1.0}seg')) > 0)
-        english_has_alignment_id = (english_p.get('{http://www.w3.org/XML/1998/namespace}id') is not None or 
-                                   len(english_p.findall('.//{http://www.tei-c.org/ns/1.0}seg')) > 0)
+        italian_has_alignment_id = (italian_p.get(XML_ID) is not None or 
+                                   _SEG_COUNT(italian_p) > 0)
+        english_has_alignment_id = (english_p.get(XML_ID) is not None or 
+                                   _SEG_COUNT(english_p) > 0)
         
         assert italian_has_alignment_id
         assert english_has_alignment_id
@@ -590,7 +751,7 @@ class TestTEIService:
         assert "Third English sentence" in english_text
         
         # Verify that XML is well-formed by parsing again
-        ET.fromstring(aligned_xml)  # Should not raise exception
+        ET.fromstring(aligned_xml.encode("utf-8"), _PARSER)  # Should not raise exception
     
     def test_text_cleaning_functionality(self, tei_service):
         """Test that text cleaning removes line breaks, tabs, and normalizes whitespace."""
@@ -655,40 +816,9 @@ class TestTEIService:
         assert "This paragraph has line breaks and multiple spaces." == first_para
         assert "Another paragraph with tabs and mixed whitespace." == second_para
     
-    def test_seg_tag_creation_for_sentence_alignments(self, tei_service):
+    def test_seg_tag_creation_for_sentence_alignments(self, tei_service, three_sentence_docs):
         """Test that sentence-level alignments create proper <seg> tags within paragraphs."""
-        # Create test documents with multi-sentence paragraphs
-        italian_tei = '''<?xml version="1.0" encoding="UTF-8"?>
-        <TEI xmlns="http://www.tei-c.org/ns/1.0">
-            <teiHeader>
-                <fileDesc>
-                    <titleStmt><title>Test Document</title></titleStmt>
-                </fileDesc>
-            </teiHeader>
-            <text>
-                <body>
-                    <p>Prima frase italiana. Seconda frase italiana. Terza frase italiana.</p>
-                </body>
-            </text>
-        </TEI>'''
-
-        english_tei = '''<?xml version="1.0" encoding="UTF-8"?>
-        <TEI xmlns="http://www.tei-c.org/ns/1.0">
-            <teiHeader>
-                <fileDesc>
-                    <titleStmt><title>Test Document</title></titleStmt>
-                </fileDesc>
-            </teiHeader>
-            <text>
-                <body>
-                    <p>First English sentence. Second English sentence. Third English sentence.</p>
-                </body>
-            </text>
-        </TEI>'''
-        
-        # Parse documents
-        source_doc = tei_service.parse_tei_file(italian_tei)
-        target_doc = tei_service.parse_tei_file(english_tei)
+        source_doc, target_doc = three_sentence_docs
         
         # Create sentence-level alignments (should trigger <seg> creation)
         alignments = [
@@ -716,77 +846,64 @@ class TestTEIService:
         ]
         
         # Generate aligned XML
-        aligned_xml = tei_service._generate_aligned_tei(source_doc, target_doc, alignments, "it", "en")
-        
-        # Parse result
-        root = ET.fromstring(aligned_xml)
+        root, aligned_xml = tei_service._generate_aligned_tei(source_doc, target_doc, alignments, "it", "en")
         
         # Verify basic structure
         assert root.tag.endswith('teiCorpus')
-        assert len(root.findall('.//{http://www.tei-c.org/ns/1.0}TEI')) == 2
+        assert _TEI_COUNT(root) == 2
         
         # Check standOff links
-        links = root.findall('.//{http://www.tei-c.org/ns/1.0}link')
+        links = _LINKS(root)
         assert len(links) == 3  # Should have 3 sentence-level links
         
         # Get the two TEI documents
-        tei_documents = root.findall('.//{http://www.tei-c.org/ns/1.0}TEI')
+        tei_documents = _TEIS(root)
         italian_doc = tei_documents[0]
         english_doc = tei_documents[1]
         
         # Test Italian document has proper <seg> tags
-        italian_p = italian_doc.find('.//{http://www.tei-c.org/ns/1.0}p')
-        italian_segs = italian_p.findall('.//{http://www.tei-c.org/ns/1.0}seg')
+        italian_p = _first(_PARAS, italian_doc)
+        italian_segs = list(italian_p.iter(_SEG_TAG))
         
         assert len(italian_segs) == 3, "Should have 3 <seg> elements for 3 sentence alignments"
         
         # Verify each seg has xml:id and correct text
-        expected_italian_texts = ["Prima frase italiana.", "Seconda frase italiana.", "Terza frase italiana."]
-        for i, seg in enumerate(italian_segs):
-            seg_id = seg.get('{http://www.w3.org/XML/1998/namespace}id')
-            assert seg_id is not None, f"<seg> {i+1} should have xml:id"
-            assert len(seg_id) > 0, f"<seg> {i+1} xml:id should not be empty"
-            assert seg.text == expected_italian_texts[i], f"<seg> {i+1} text mismatch"
+        for seg, expected in zip(italian_segs, _THREE_SENTENCE_ITALIAN_SENTENCES, strict=True):
+            seg_id = seg.get(XML_ID)
+            assert seg_id is not None, f"<seg> for {expected!r} should have xml:id"
+            assert len(seg_id) > 0, f"<seg> for {expected!r} xml:id should not be empty"
+            assert seg.text == expected, f"<seg> text mismatch, expected {expected!r}"
         
         # Test English document has proper <seg> tags
-        english_p = english_doc.find('.//{http://www.tei-c.org/ns/1.0}p')
-        english_segs = english_p.findall('.//{http://www.tei-c.org/ns/1.0}seg')
+        english_p = _first(_PARAS, english_doc)
+        english_segs = list(english_p.iter(_SEG_TAG))
         
         assert len(english_segs) == 3, "Should have 3 <seg> elements for 3 sentence alignments"
         
         # Verify each seg has xml:id and correct text
-        expected_english_texts = ["First English sentence.", "Second English sentence.", "Third English sentence."]
-        for i, seg in enumerate(english_segs):
-            seg_id = seg.get('{http://www.w3.org/XML/1998/namespace}id')
-            assert seg_id is not None, f"<seg> {i+1} should have xml:id"
-            assert len(seg_id) > 0, f"<seg> {i+1} xml:id should not be empty"
-            assert seg.text == expected_english_texts[i], f"<seg> {i+1} text mismatch"
+        for seg, expected in zip(english_segs, _THREE_SENTENCE_ENGLISH_SENTENCES, strict=True):
+            seg_id = seg.get(XML_ID)
+            assert seg_id is not None, f"<seg> for {expected!r} should have xml:id"
+            assert len(seg_id) > 0, f"<seg> for {expected!r} xml:id should not be empty"
+            assert seg.text == expected, f"<seg> text mismatch, expected {expected!r}"
         
         # Verify that paragraph-level text is preserved when reconstructed
         italian_reconstructed = tei_service._get_element_text(italian_p)
         english_reconstructed = tei_service._get_element_text(english_p)
         
-        assert "Prima frase italiana" in italian_reconstructed
-        assert "Seconda frase italiana" in italian_reconstructed
-        assert "Terza frase italiana" in italian_reconstructed
-        
-        assert "First English sentence" in english_reconstructed
-        assert "Second English sentence" in english_reconstructed  
-        assert "Third English sentence" in english_reconstructed
+        # One scan per language; the set holds every distinct sentence that was found
+        assert len(set(_ITALIAN_PHRASES_RE.findall(italian_reconstructed))) == 3
+        assert len(set(_ENGLISH_PHRASES_RE.findall(english_reconstructed))) == 3
         
         # Verify standOff links reference the correct seg IDs
-        all_seg_ids = set()
-        for seg in italian_segs + english_segs:
-            all_seg_ids.add(seg.get('{http://www.w3.org/XML/1998/namespace}id'))
+        all_seg_ids = {seg.attrib[XML_ID] for seg in chain(italian_segs, english_segs)}
         
+        referenced_ids = set()
         for link in links:
-            target = link.get('target')
-            ids = target.split()
-            source_id = ids[0][1:]  # Remove #
-            target_id = ids[1][1:]  # Remove #
-            
-            assert source_id in all_seg_ids, f"Link source ID {source_id} not found in seg elements"
-            assert target_id in all_seg_ids, f"Link target ID {target_id} not found in seg elements"
+            source_ref, _, target_ref = link.get('target').partition(' ')
+            referenced_ids.update((source_ref[1:], target_ref[1:]))  # Remove #
+        
+        assert referenced_ids <= all_seg_ids, f"Link IDs not found in seg elements: {referenced_ids - all_seg_ids}"
     
     def test_head_elements_get_seg_tags(self, tei_service):
         """Test that head elements also get <seg> tags for alignments."""
@@ -844,113 +961,83 @@ class TestTEIService:
         ]
         
         # Generate aligned XML
-        aligned_xml = tei_service._generate_aligned_tei(source_doc, target_doc, alignments, "it", "en")
-        
-        # Parse result
-        root = ET.fromstring(aligned_xml)
+        root, aligned_xml = tei_service._generate_aligned_tei(source_doc, target_doc, alignments, "it", "en")
         
         # Verify basic structure
         assert root.tag.endswith('teiCorpus')
-        assert len(root.findall('.//{http://www.tei-c.org/ns/1.0}TEI')) == 2
+        assert _TEI_COUNT(root) == 2
         
         # Check standOff links
-        links = root.findall('.//{http://www.tei-c.org/ns/1.0}link')
+        links = _LINKS(root)
         assert len(links) == 2  # Should have 2 links
         
         # Get the two TEI documents
-        tei_documents = root.findall('.//{http://www.tei-c.org/ns/1.0}TEI')
+        tei_documents = _TEIS(root)
         italian_doc = tei_documents[0]
         english_doc = tei_documents[1]
         
+        # One walk over the corpus buckets every <seg> by its parent element
+        segs_by_parent = {}
+        for seg in root.iter(_SEG_TAG):
+            segs_by_parent.setdefault(seg.getparent(), []).append(seg)
+        
         # Test Italian document has <seg> tags in both head and p
-        italian_head = italian_doc.find('.//{http://www.tei-c.org/ns/1.0}head')
-        italian_p = italian_doc.find('.//{http://www.tei-c.org/ns/1.0}p')
+        italian_head = _first(_HEADS, italian_doc)
+        italian_p = _first(_PARAS, italian_doc)
         
         # Check head element has <seg> tag
-        italian_head_segs = italian_head.findall('.//{http://www.tei-c.org/ns/1.0}seg')
+        italian_head_segs = segs_by_parent.get(italian_head, [])
         assert len(italian_head_segs) == 1, "Head element should have 1 <seg> element"
         assert italian_head_segs[0].text == "Titolo principale in italiano"
-        assert italian_head_segs[0].get('{http://www.w3.org/XML/1998/namespace}id') is not None
+        assert italian_head_segs[0].get(XML_ID) is not None
         
         # Check p element has <seg> tag  
-        italian_p_segs = italian_p.findall('.//{http://www.tei-c.org/ns/1.0}seg')
+        italian_p_segs = segs_by_parent.get(italian_p, [])
         assert len(italian_p_segs) == 1, "Paragraph element should have 1 <seg> element"
         assert italian_p_segs[0].text == "Paragrafo in italiano."
-        assert italian_p_segs[0].get('{http://www.w3.org/XML/1998/namespace}id') is not None
+        assert italian_p_segs[0].get(XML_ID) is not None
         
         # Test English document has <seg> tags in both head and p
-        english_head = english_doc.find('.//{http://www.tei-c.org/ns/1.0}head')
-        english_p = english_doc.find('.//{http://www.tei-c.org/ns/1.0}p')
+        english_head = _first(_HEADS, english_doc)
+        english_p = _first(_PARAS, english_doc)
         
         # Check head element has <seg> tag
-        english_head_segs = english_head.findall('.//{http://www.tei-c.org/ns/1.0}seg')
+        english_head_segs = segs_by_parent.get(english_head, [])
         assert len(english_head_segs) == 1, "Head element should have 1 <seg> element"
         assert english_head_segs[0].text == "Main title in English"
-        assert english_head_segs[0].get('{http://www.w3.org/XML/1998/namespace}id') is not None
+        assert english_head_segs[0].get(XML_ID) is not None
         
         # Check p element has <seg> tag
-        english_p_segs = english_p.findall('.//{http://www.tei-c.org/ns/1.0}seg')
+        english_p_segs = segs_by_parent.get(english_p, [])
         assert len(english_p_segs) == 1, "Paragraph element should have 1 <seg> element"
         assert english_p_segs[0].text == "Paragraph in English."
-        assert english_p_segs[0].get('{http://www.w3.org/XML/1998/namespace}id') is not None
+        assert english_p_segs[0].get(XML_ID) is not None
         
         # Verify standOff links reference the correct seg IDs
-        all_seg_ids = set()
-        for seg in italian_head_segs + italian_p_segs + english_head_segs + english_p_segs:
-            all_seg_ids.add(seg.get('{http://www.w3.org/XML/1998/namespace}id'))
+        all_seg_ids = {
+            seg.attrib[XML_ID]
+            for seg in chain(italian_head_segs, italian_p_segs, english_head_segs, english_p_segs)
+        }
         
+        referenced_ids = set()
         for link in links:
-            target = link.get('target')
-            ids = target.split()
-            source_id = ids[0][1:]  # Remove #
-            target_id = ids[1][1:]  # Remove #
-            
-            assert source_id in all_seg_ids, f"Link source ID {source_id} not found in seg elements"
-            assert target_id in all_seg_ids, f"Link target ID {target_id} not found in seg elements"
-
-    @patch("app.services.tei_service.uuid.uuid4")
-    def test_xml_id_uniqueness_many_to_many_alignment(self, mock_uuid, tei_service):
-        """Test that xml:id attributes are unique even in many-to-many alignments."""
-        # Create unique UUID sequence for testing
-        uuid_sequence = [f"uuid-{i}" for i in range(10)]
-        mock_uuids = []
-        for uid in uuid_sequence:
-            mock_obj = Mock()
-            mock_obj.__str__ = lambda self, uid=uid: uid
-            mock_uuids.append(mock_obj)
-        mock_uuid.side_effect = mock_uuids
-        
-        # TEI documents with multiple sentences that could create many-to-many alignments
-        source_tei = """<?xml version="1.0" encoding="UTF-8"?>
-<TEI xmlns="http://www.tei-c.org/ns/1.0">
-    <teiHeader>
-        <fileDesc>
-            <titleStmt><title>Test</title></titleStmt>
-        </fileDesc>
-    </teiHeader>
-    <text>
-        <body>
-            <p>Prima frase. Seconda frase. Terza frase.</p>
-        </body>
-    </text>
-</TEI>"""
+            source_ref, _, target_ref = link.get('target').partition(' ')
+            referenced_ids.update((source_ref[1:], target_ref[1:]))  # Remove #
         
-        target_tei = """<?xml version="1.0" encoding="UTF-8"?>
-<TEI xmlns="http://www.tei-c.org/ns/1.0">
-    <teiHeader>
-        <fileDesc>
-            <titleStmt><title>Test</title></titleStmt>
-        </fileDesc>
-    </teiHeader>
-    <text>
-        <body>
-            <p>First sentence. Second sentence. Third sentence.</p>
-        </body>
-    </text>
-</TEI>"""
-        
-        # Mock alignment result with many-to-many alignment
-        mock_alignment = AlignmentResponse(
+        assert referenced_ids <= all_seg_ids, f"Link IDs not found in seg elements: {referenced_ids - all_seg_ids}"
+
+
+class TestManyToManyAlignment:
+    """xml:id integrity of a corpus built from many-to-many alignments.
+
+    The corpus is aligned once per class and each test checks one property of it.
+    """
+    
+    @pytest.fixture(scope="class")
+    def aligned_root(self, bertalign_stub_factory):
+        """Aligned corpus for a 2-to-1 and a 1-to-2 alignment of three sentences."""
+        bertalign = bertalign_stub_factory()
+        bertalign.align_texts.return_value = AlignmentResponse(
             alignments=[
                 AlignmentPair(
                     source_sentences=["Prima frase.", "Seconda frase."],
@@ -980,46 +1067,30 @@ class TestTEIService:
             )
         )
         
-        tei_service.bertalign_service.align_texts.return_value = mock_alignment
+        result = TEIService(bertalign).align_tei_documents(_MANY_TO_MANY_SOURCE_TEI, _MANY_TO_MANY_TARGET_TEI)
+        return result["aligned_tree"]
+    
+    def test_all_xml_ids_unique(self, aligned_root):
+        """Test that no xml:id appears twice anywhere in the corpus."""
+        xml_ids = _XML_IDS(aligned_root)
+        assert len(xml_ids) == len(set(xml_ids)), f"Duplicate xml:id found: {xml_ids}"
+    
+    def test_seg_ids_unique(self, aligned_root):
+        """Test that seg elements are created and carry distinct xml:ids."""
+        assert _SEG_COUNT(aligned_root) > 0, "Should have seg elements"
         
-        # Perform alignment
-        result = tei_service.align_tei_documents(source_tei, target_tei)
-        
-        # Parse result
-        aligned_xml = result["aligned_xml"]
-        root = ET.fromstring(aligned_xml)
-        
-        # Extract all xml:id attributes
-        xml_ids = []
-        for elem in root.iter():
-            xml_id = elem.get("{http://www.w3.org/XML/1998/namespace}id")
-            if xml_id:
-                xml_ids.append(xml_id)
-        
-        # Verify all xml:id attributes are unique
-        unique_ids = set(xml_ids)
-        assert len(xml_ids) == len(unique_ids), f"Duplicate xml:id found: {xml_ids}"
-        
-        # Verify we have the expected number of segments
-        seg_elements = root.findall(".//{http://www.tei-c.org/ns/1.0}seg")
-        assert len(seg_elements) > 0, "Should have seg elements"
-        
-        # Verify all seg elements have unique xml:id
-        seg_ids = [seg.get("{http://www.w3.org/XML/1998/namespace}id") for seg in seg_elements]
-        seg_ids = [sid for sid in seg_ids if sid]  # Filter out None
+        seg_ids = _SEG_IDS(aligned_root)
         assert len(seg_ids) == len(set(seg_ids)), f"Duplicate seg xml:id found: {seg_ids}"
-        
-        # Verify linkGrp structure handles many-to-many correctly
-        links = root.findall(".//{http://www.tei-c.org/ns/1.0}link")
+    
+    def test_link_targets_resolve(self, aligned_root):
+        """Test that every link target points at an xml:id in the corpus."""
+        links = _LINKS(aligned_root)
         assert len(links) > 0, "Should have link elements"
         
-        # Each link should reference valid, unique xml:id values
+        existing_ids = set(_XML_IDS(aligned_root))
+        referenced_ids = set()
         for link in links:
-            target = link.get("target")
-            ids = target.split()
-            # Remove # prefix from each ID
-            referenced_ids = [id_ref[1:] for id_ref in ids]
-            
-            # All referenced IDs should exist in the document
-            for ref_id in referenced_ids:
-                assert ref_id in unique_ids, f"Link references non-existent ID: {ref_id}"
+            # Drop the # prefixes in one pass before splitting the references
+            referenced_ids.update(link.get("target").replace('#', '').split())
+        
+        assert referenced_ids <= existing_ids, f"Links reference non-existent IDs: {referenced_ids - existing_ids}"